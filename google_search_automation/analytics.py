@@ -0,0 +1,411 @@
+from datetime import timedelta
+from db_pool import postgres_connection, oracle_connection, close_pools
+from result_recorder import POSTGRES, ORACLE
+import argparse
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Pass rate, flake rate and failure streaks are maintained incrementally in three tables (see db_schema.py):
+#   - test_daily_summary: runs, passes and flips (status differs from the previous run) per test and day
+#   - test_summary_state: per test, the last processed run, its status and the current and longest failure streaks
+#   - test_summary_watermark: the ingestion time up to which test_results has been summarized
+# A refresh only reads the test_results rows that arrived since the previous refresh, through the ingested_at index,
+# so dashboards read the small summary tables instead of the raw history. Tracking arrival rather than test time also
+# picks up rows delivered late with an older test time, such as replayed spool files and SQLite syncs; those count in
+# the daily runs and rates, while the current status and failure streak stay with the newest run.
+# Duration percentiles are not additive, so they are computed from test_step_timings over the requested window.
+
+PASSED = 'PASSED'
+
+POSTGRES_SQL = {
+    'lock': "LOCK TABLE test_summary_state IN EXCLUSIVE MODE",
+    'clear': ["DELETE FROM test_daily_summary", "DELETE FROM test_summary_state"],
+    'now': "SELECT CAST(clock_timestamp() AT TIME ZONE 'UTC' AS TIMESTAMP)",
+    'watermark': "SELECT MAX(ingested_until) FROM test_summary_watermark",
+    'clear_watermark': "DELETE FROM test_summary_watermark",
+    'set_watermark': "INSERT INTO test_summary_watermark (ingested_until) VALUES (%(upto)s)",
+    # Rows that arrived since the last refresh, with the previous status of the same test (from the state table for the first one)
+    # and the number of passes up to and including each row, which numbers the failure streaks.
+    'new_rows': """
+        SELECT r.test_name, r.timestamp AS ts, r.status,
+               CASE WHEN r.status = '{passed}' THEN 1 ELSE 0 END AS passed,
+               CASE WHEN COALESCE(LAG(r.status) OVER (PARTITION BY r.test_name ORDER BY r.timestamp), s.last_status) <> r.status
+                    THEN 1 ELSE 0 END AS flipped,
+               SUM(CASE WHEN r.status = '{passed}' THEN 1 ELSE 0 END)
+                   OVER (PARTITION BY r.test_name ORDER BY r.timestamp ROWS UNBOUNDED PRECEDING) AS passes_so_far,
+               ROW_NUMBER() OVER (PARTITION BY r.test_name ORDER BY r.timestamp DESC) AS newest_first
+        FROM test_results r
+        LEFT JOIN test_summary_state s ON s.test_name = r.test_name
+        WHERE (%(since)s IS NULL OR r.ingested_at > %(since)s) AND r.ingested_at <= %(upto)s
+    """,
+    'update_daily': """
+        INSERT INTO test_daily_summary (test_name, run_day, runs, passes, flips)
+        SELECT test_name, CAST(ts AS DATE), COUNT(*), SUM(passed), SUM(flipped)
+        FROM ({new_rows}) new_rows
+        GROUP BY test_name, CAST(ts AS DATE)
+        ON CONFLICT (test_name, run_day) DO UPDATE SET
+            runs = test_daily_summary.runs + EXCLUDED.runs,
+            passes = test_daily_summary.passes + EXCLUDED.passes,
+            flips = test_daily_summary.flips + EXCLUDED.flips
+    """,
+    'update_state': """
+        INSERT INTO test_summary_state (test_name, last_time, last_status, runs, fail_streak, longest_fail_streak)
+        WITH new_rows AS ({new_rows}),
+        streaks AS (
+            SELECT test_name, passes_so_far, COUNT(*) AS failures
+            FROM new_rows
+            WHERE passed = 0
+            GROUP BY test_name, passes_so_far
+        ),
+        per_test AS (
+            SELECT test_name, COUNT(*) AS runs, MAX(passes_so_far) AS passes, MAX(ts) AS last_time,
+                   MAX(CASE WHEN newest_first = 1 THEN status END) AS last_status
+            FROM new_rows
+            GROUP BY test_name
+        ),
+        per_test_streaks AS (
+            SELECT p.test_name,
+                   COALESCE(SUM(CASE WHEN f.passes_so_far = 0 THEN f.failures END), 0) AS head_failures,
+                   COALESCE(SUM(CASE WHEN f.passes_so_far = p.passes THEN f.failures END), 0) AS tail_failures,
+                   COALESCE(MAX(f.failures), 0) AS longest_failures
+            FROM per_test p
+            LEFT JOIN streaks f ON f.test_name = p.test_name
+            GROUP BY p.test_name
+        )
+        SELECT p.test_name, COALESCE(GREATEST(p.last_time, s.last_time), p.last_time),
+               CASE WHEN p.last_time < s.last_time THEN s.last_status ELSE p.last_status END,
+               COALESCE(s.runs, 0) + p.runs,
+               CASE WHEN p.last_time < s.last_time THEN s.fail_streak
+                    WHEN p.passes = 0 THEN COALESCE(s.fail_streak, 0) + k.tail_failures ELSE k.tail_failures END,
+               GREATEST(COALESCE(s.longest_fail_streak, 0), COALESCE(s.fail_streak, 0) + k.head_failures, k.longest_failures)
+        FROM per_test p
+        JOIN per_test_streaks k ON k.test_name = p.test_name
+        LEFT JOIN test_summary_state s ON s.test_name = p.test_name
+        ON CONFLICT (test_name) DO UPDATE SET
+            last_time = EXCLUDED.last_time,
+            last_status = EXCLUDED.last_status,
+            runs = EXCLUDED.runs,
+            fail_streak = EXCLUDED.fail_streak,
+            longest_fail_streak = EXCLUDED.longest_fail_streak
+    """,
+    'summary': """
+        SELECT d.test_name, SUM(d.runs),
+               1.0 * SUM(d.passes) / SUM(d.runs),
+               1.0 * SUM(d.flips) / SUM(d.runs),
+               s.fail_streak, s.longest_fail_streak, s.last_status
+        FROM test_daily_summary d
+        JOIN test_summary_state s ON s.test_name = d.test_name
+        WHERE d.run_day >= CURRENT_DATE - %(days)s
+        GROUP BY d.test_name, s.fail_streak, s.longest_fail_streak, s.last_status
+        ORDER BY d.test_name
+    """,
+    # Rolling rates per day; the inner query starts window - 1 days early so the first days get a full window.
+    'trend': """
+        SELECT test_name, run_day, runs, pass_rate, flake_rate
+        FROM (
+            SELECT test_name, run_day, runs,
+                   1.0 * SUM(passes) OVER w / SUM(runs) OVER w AS pass_rate,
+                   1.0 * SUM(flips) OVER w / SUM(runs) OVER w AS flake_rate
+            FROM test_daily_summary
+            WHERE run_day >= CURRENT_DATE - %(days)s - %(window_days)s + 1
+            WINDOW w AS (PARTITION BY test_name ORDER BY run_day
+                         RANGE BETWEEN make_interval(days => %(window_days)s - 1) PRECEDING AND CURRENT ROW)
+        ) rolling
+        WHERE run_day >= CURRENT_DATE - %(days)s
+        ORDER BY test_name, run_day
+    """,
+    'durations': """
+        SELECT test_name, COUNT(*),
+               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY total_ms),
+               PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY total_ms)
+        FROM (
+            SELECT test_name, timestamp, SUM(duration_ms) AS total_ms
+            FROM test_step_timings
+            WHERE timestamp >= CURRENT_DATE - %(days)s
+            GROUP BY test_name, timestamp
+        ) runs
+        GROUP BY test_name
+        ORDER BY test_name
+    """,
+}
+
+ORACLE_SQL = {
+    'lock': "LOCK TABLE test_summary_state IN EXCLUSIVE MODE",
+    'clear': ["DELETE FROM test_daily_summary", "DELETE FROM test_summary_state"],
+    'now': "SELECT SYS_EXTRACT_UTC(SYSTIMESTAMP) FROM dual",
+    'watermark': "SELECT MAX(ingested_until) FROM test_summary_watermark",
+    'clear_watermark': "DELETE FROM test_summary_watermark",
+    'set_watermark': "INSERT INTO test_summary_watermark (ingested_until) VALUES (:upto)",
+    'new_rows': """
+        SELECT r.test_name, r.test_time AS ts, r.status,
+               CASE WHEN r.status = '{passed}' THEN 1 ELSE 0 END AS passed,
+               CASE WHEN COALESCE(LAG(r.status) OVER (PARTITION BY r.test_name ORDER BY r.test_time), s.last_status) <> r.status
+                    THEN 1 ELSE 0 END AS flipped,
+               SUM(CASE WHEN r.status = '{passed}' THEN 1 ELSE 0 END)
+                   OVER (PARTITION BY r.test_name ORDER BY r.test_time ROWS UNBOUNDED PRECEDING) AS passes_so_far,
+               ROW_NUMBER() OVER (PARTITION BY r.test_name ORDER BY r.test_time DESC) AS newest_first
+        FROM test_results r
+        LEFT JOIN test_summary_state s ON s.test_name = r.test_name
+        WHERE (:since IS NULL OR r.ingested_at > :since) AND r.ingested_at <= :upto
+    """,
+    'update_daily': """
+        MERGE INTO test_daily_summary t
+        USING (
+            SELECT test_name, TRUNC(ts) AS run_day, COUNT(*) AS runs, SUM(passed) AS passes, SUM(flipped) AS flips
+            FROM ({new_rows})
+            GROUP BY test_name, TRUNC(ts)
+        ) src
+        ON (t.test_name = src.test_name AND t.run_day = src.run_day)
+        WHEN MATCHED THEN UPDATE SET
+            t.runs = t.runs + src.runs,
+            t.passes = t.passes + src.passes,
+            t.flips = t.flips + src.flips
+        WHEN NOT MATCHED THEN INSERT (test_name, run_day, runs, passes, flips)
+            VALUES (src.test_name, src.run_day, src.runs, src.passes, src.flips)
+    """,
+    'update_state': """
+        MERGE INTO test_summary_state t
+        USING (
+            WITH new_rows AS ({new_rows}),
+            streaks AS (
+                SELECT test_name, passes_so_far, COUNT(*) AS failures
+                FROM new_rows
+                WHERE passed = 0
+                GROUP BY test_name, passes_so_far
+            ),
+            per_test AS (
+                SELECT test_name, COUNT(*) AS runs, MAX(passes_so_far) AS passes, MAX(ts) AS last_time,
+                       MAX(CASE WHEN newest_first = 1 THEN status END) AS last_status
+                FROM new_rows
+                GROUP BY test_name
+            ),
+            per_test_streaks AS (
+                SELECT p.test_name,
+                       COALESCE(SUM(CASE WHEN f.passes_so_far = 0 THEN f.failures END), 0) AS head_failures,
+                       COALESCE(SUM(CASE WHEN f.passes_so_far = p.passes THEN f.failures END), 0) AS tail_failures,
+                       COALESCE(MAX(f.failures), 0) AS longest_failures
+                FROM per_test p
+                LEFT JOIN streaks f ON f.test_name = p.test_name
+                GROUP BY p.test_name
+            )
+            SELECT p.test_name, COALESCE(GREATEST(p.last_time, s.last_time), p.last_time) AS last_time,
+                   CASE WHEN p.last_time < s.last_time THEN s.last_status ELSE p.last_status END AS last_status,
+                   COALESCE(s.runs, 0) + p.runs AS runs,
+                   CASE WHEN p.last_time < s.last_time THEN s.fail_streak
+                        WHEN p.passes = 0 THEN COALESCE(s.fail_streak, 0) + k.tail_failures ELSE k.tail_failures END AS fail_streak,
+                   GREATEST(COALESCE(s.longest_fail_streak, 0), COALESCE(s.fail_streak, 0) + k.head_failures, k.longest_failures) AS longest_fail_streak
+            FROM per_test p
+            JOIN per_test_streaks k ON k.test_name = p.test_name
+            LEFT JOIN test_summary_state s ON s.test_name = p.test_name
+        ) src
+        ON (t.test_name = src.test_name)
+        WHEN MATCHED THEN UPDATE SET
+            t.last_time = src.last_time,
+            t.last_status = src.last_status,
+            t.runs = src.runs,
+            t.fail_streak = src.fail_streak,
+            t.longest_fail_streak = src.longest_fail_streak
+        WHEN NOT MATCHED THEN INSERT (test_name, last_time, last_status, runs, fail_streak, longest_fail_streak)
+            VALUES (src.test_name, src.last_time, src.last_status, src.runs, src.fail_streak, src.longest_fail_streak)
+    """,
+    'summary': """
+        SELECT d.test_name, SUM(d.runs),
+               SUM(d.passes) / SUM(d.runs),
+               SUM(d.flips) / SUM(d.runs),
+               s.fail_streak, s.longest_fail_streak, s.last_status
+        FROM test_daily_summary d
+        JOIN test_summary_state s ON s.test_name = d.test_name
+        WHERE d.run_day >= TRUNC(SYSDATE) - :days
+        GROUP BY d.test_name, s.fail_streak, s.longest_fail_streak, s.last_status
+        ORDER BY d.test_name
+    """,
+    'trend': """
+        SELECT test_name, run_day, runs, pass_rate, flake_rate
+        FROM (
+            SELECT test_name, run_day, runs,
+                   SUM(passes) OVER (PARTITION BY test_name ORDER BY run_day RANGE BETWEEN :window_days - 1 PRECEDING AND CURRENT ROW)
+                   / SUM(runs) OVER (PARTITION BY test_name ORDER BY run_day RANGE BETWEEN :window_days - 1 PRECEDING AND CURRENT ROW) AS pass_rate,
+                   SUM(flips) OVER (PARTITION BY test_name ORDER BY run_day RANGE BETWEEN :window_days - 1 PRECEDING AND CURRENT ROW)
+                   / SUM(runs) OVER (PARTITION BY test_name ORDER BY run_day RANGE BETWEEN :window_days - 1 PRECEDING AND CURRENT ROW) AS flake_rate
+            FROM test_daily_summary
+            WHERE run_day >= TRUNC(SYSDATE) - :days - :window_days + 1
+        )
+        WHERE run_day >= TRUNC(SYSDATE) - :days
+        ORDER BY test_name, run_day
+    """,
+    'durations': """
+        SELECT test_name, COUNT(*),
+               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY total_ms),
+               PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY total_ms)
+        FROM (
+            SELECT test_name, test_time, SUM(duration_ms) AS total_ms
+            FROM test_step_timings
+            WHERE test_time >= TRUNC(SYSDATE) - :days
+            GROUP BY test_name, test_time
+        )
+        GROUP BY test_name
+        ORDER BY test_name
+    """,
+}
+
+BACKENDS = {
+    POSTGRES: (postgres_connection, POSTGRES_SQL),
+    ORACLE: (oracle_connection, ORACLE_SQL),
+}
+
+
+def settle_delay():
+    """
+    Input: None
+    Output: (timedelta) - How long ago a result must have arrived before it is summarized or exported
+    Description: Reads ANALYTICS_SETTLE_SECONDS (default 60). A row's ingestion time is taken when its insert starts,
+    so rows whose write transaction is still open when a refresh runs are left for the next one instead of being skipped.
+    """
+    return timedelta(seconds=float(os.getenv('ANALYTICS_SETTLE_SECONDS', '60')))
+
+
+def ingestion_cutoff(backend):
+    """
+    Input: backend (str) - POSTGRES or ORACLE
+    Output: (datetime) - Newest ingestion time (UTC, by the database clock) of the rows that may be processed now
+    Description: The database's current time minus settle_delay(), so the cutoff does not depend on the client's clock.
+    """
+    connection_factory, sql = BACKENDS[backend]
+    with connection_factory() as connection:
+        cursor = connection.cursor()
+        cursor.execute(sql['now'])
+        now = cursor.fetchone()[0]
+        cursor.close()
+        connection.rollback()
+    return now - settle_delay()
+
+
+def refresh_summary(backend, rebuild=False):
+    """
+    Input:
+        - backend: POSTGRES or ORACLE (str)
+        - rebuild: Recompute the summary from the whole history instead of only the new rows (bool)
+    Output: None
+    Description: Folds the test results that arrived since the last refresh into the summary tables, in one transaction.
+    Refreshes running at the same time wait for each other on a table lock. Without a watermark (the first refresh, or the
+    first one since the summary was tracked by test time) the summary is rebuilt.
+    """
+    connection_factory, sql = BACKENDS[backend]
+    new_rows = sql['new_rows'].format(passed=PASSED)
+    upto = ingestion_cutoff(backend)
+    with connection_factory() as connection:
+        cursor = connection.cursor()
+        cursor.execute(sql['lock'])
+        cursor.execute(sql['watermark'])
+        since = cursor.fetchone()[0]
+        if rebuild or since is None:
+            since = None
+            for statement in sql['clear']:
+                cursor.execute(statement)
+        elif upto <= since:
+            cursor.close()
+            connection.rollback()
+            logger.info(f"The {backend} test summary is up to date")
+            return
+        params = {'since': since, 'upto': upto}
+        # Both statements select the same new rows: the daily counts first, then the state they are filtered by.
+        cursor.execute(sql['update_daily'].format(new_rows=new_rows), params)
+        cursor.execute(sql['update_state'].format(new_rows=new_rows), params)
+        updated_tests = cursor.rowcount
+        cursor.execute(sql['clear_watermark'])
+        cursor.execute(sql['set_watermark'], {'upto': upto})
+        connection.commit()
+        cursor.close()
+    logger.info(f"Refreshed the {backend} test summary ({updated_tests} tests updated)")
+
+
+def _fetch(backend, query, **params):
+    """
+    Input:
+        - backend: POSTGRES or ORACLE (str)
+        - query: Key of the query in the backend's SQL mapping (str)
+        - params: Bind parameters of the query
+    Output: (list) - All rows of the query
+    Description: Runs one read-only analytics query.
+    """
+    connection_factory, sql = BACKENDS[backend]
+    with connection_factory() as connection:
+        cursor = connection.cursor()
+        cursor.execute(sql[query], params)
+        rows = cursor.fetchall()
+        cursor.close()
+        connection.rollback()
+    return rows
+
+
+def fetch_summary(backend, days=30):
+    """
+    Input:
+        - backend: POSTGRES or ORACLE (str)
+        - days: Size of the window in days, ending today (int)
+    Output: (list) - (test_name, runs, pass_rate, flake_rate, fail_streak, longest_fail_streak, last_status) per test
+    Description: Pass and flake rates over the window, read from the daily summary. Streaks cover the whole history.
+    """
+    return _fetch(backend, 'summary', days=days)
+
+
+def fetch_trend(backend, days=30, window=7):
+    """
+    Input:
+        - backend: POSTGRES or ORACLE (str)
+        - days: Number of days to return, ending today (int)
+        - window: Number of days each rolling rate covers (int)
+    Output: (list) - (test_name, run_day, runs, pass_rate, flake_rate) per test and day with runs
+    Description: Rolling pass and flake rates per day, computed with window functions over the daily summary.
+    """
+    return _fetch(backend, 'trend', days=days, window_days=window)
+
+
+def fetch_duration_percentiles(backend, days=30):
+    """
+    Input:
+        - backend: POSTGRES or ORACLE (str)
+        - days: Size of the window in days, ending today (int)
+    Output: (list) - (test_name, runs, p50_ms, p95_ms) per test
+    Description: Percentiles of the total timed duration of each run, summed from its steps in test_step_timings.
+    """
+    return _fetch(backend, 'durations', days=days)
+
+
+def print_report(backend, days=30, window=7, trend=False):
+    try:
+        if trend:
+            print(f"Daily {window}-day rolling rates from {backend}:")
+            for test_name, run_day, runs, pass_rate, flake_rate in fetch_trend(backend, days, window):
+                print(f"Test Name: {test_name}, Day: {run_day:%Y-%m-%d}, Runs: {runs}, Pass Rate: {pass_rate:.1%}, Flake Rate: {flake_rate:.1%}")
+            return
+
+        durations = {row[0]: row[2:] for row in fetch_duration_percentiles(backend, days)}
+        print(f"Test summary for the last {days} days from {backend}:")
+        for test_name, runs, pass_rate, flake_rate, fail_streak, longest, last_status in fetch_summary(backend, days):
+            p50, p95 = durations.get(test_name, (None, None))
+            timing = f", p50: {p50:.0f} ms, p95: {p95:.0f} ms" if p50 is not None else ""
+            print(f"Test Name: {test_name}, Runs: {runs}, Pass Rate: {pass_rate:.1%}, Flake Rate: {flake_rate:.1%}, "
+                  f"Last Status: {last_status}, Failure Streak: {fail_streak} (longest {longest}){timing}")
+    except Exception as e:
+        print(f"Failed to fetch the test summary from {backend}: {str(e)}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Pass rate, flake rate, failure streaks and duration percentiles per test.")
+    parser.add_argument('--backend', choices=['postgres', 'oracle'], default='postgres')
+    parser.add_argument('--refresh', action='store_true', help="Summarize new test results before reporting")
+    parser.add_argument('--rebuild', action='store_true', help="Recompute the summary from the whole history")
+    parser.add_argument('--trend', action='store_true', help="Print rolling rates per day instead of one line per test")
+    parser.add_argument('--days', type=int, default=30, help="Number of days to report on")
+    parser.add_argument('--window', type=int, default=7, help="With --trend, the number of days each rolling rate covers")
+    args = parser.parse_args()
+
+    backend = POSTGRES if args.backend == 'postgres' else ORACLE
+    if args.refresh or args.rebuild:
+        refresh_summary(backend, rebuild=args.rebuild)
+    print_report(backend, args.days, args.window, args.trend)
+    close_pools()
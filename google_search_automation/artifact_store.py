@@ -0,0 +1,114 @@
+from contextlib import closing
+import threading
+import sqlite3
+import logging
+import json
+import time
+import uuid
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.artifacts.sqlite3')
+
+
+def new_run_id():
+    """
+    Input: None
+    Output: (str) - Identifier of a test run
+    Description: Returns TEST_RUN_ID when it is set, otherwise a fresh random id.
+    """
+    return os.getenv('TEST_RUN_ID') or uuid.uuid4().hex
+
+
+class ArtifactStore:
+    """
+    Values one test produces for another (the sponsored URL, the YouTube links), keyed by run id, query and name.
+    Backed by a small SQLite file in WAL mode, so pytest-xdist workers and concurrent runs can share
+    it safely: each run only sees its own run id, and a consumer on another worker can wait for a producer.
+    """
+
+    def __init__(self, run_id, path=DEFAULT_PATH):
+        self.run_id = run_id
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS artifacts (
+                run_id TEXT NOT NULL,
+                query TEXT NOT NULL,
+                name TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (run_id, query, name)
+            )
+        """)
+
+    def put(self, query, name, value):
+        """
+        Input:
+            - query: Search query the value belongs to (str)
+            - name: Artifact name, e.g. 'sponsored_url' (str)
+            - value: Any JSON-serializable value
+        Output: None
+        Description: Stores or replaces an artifact for this run.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO artifacts (run_id, query, name, value, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.run_id, query, name, json.dumps(value), time.time())
+            )
+        logger.info(f"Stored artifact '{name}' for query '{query}'")
+
+    def get(self, query, name, default=None):
+        """
+        Input:
+            - query: Search query the value belongs to (str)
+            - name: Artifact name (str)
+            - default: Returned when the artifact does not exist
+        Output: The stored value, or default
+        Description: Reads an artifact of this run.
+        """
+        with self._lock, closing(self._connection.execute(
+            "SELECT value FROM artifacts WHERE run_id = ? AND query = ? AND name = ?",
+            (self.run_id, query, name)
+        )) as cursor:
+            row = cursor.fetchone()
+        return json.loads(row[0]) if row else default
+
+    def wait_for(self, query, name, timeout=0.0, poll_interval=0.5):
+        """
+        Input:
+            - query: Search query the value belongs to (str)
+            - name: Artifact name (str)
+            - timeout: Seconds to wait for another process to store it (float)
+            - poll_interval: Seconds between checks (float)
+        Output: The stored value, or None if it did not appear in time
+        Description: Returns an artifact as soon as it exists, waiting up to timeout seconds for it.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            value = self.get(query, name)
+            if value is not None or time.monotonic() >= deadline:
+                return value
+            time.sleep(poll_interval)
+
+    def purge(self, older_than_s=7 * 24 * 3600):
+        """
+        Input: older_than_s - Age in seconds after which artifacts of any run are deleted (float)
+        Output: None
+        Description: Keeps the store small by dropping artifacts of old runs.
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM artifacts WHERE created_at < ?", (time.time() - older_than_s,))
+
+    def close(self):
+        """
+        Input: None
+        Output: None
+        Description: Closes the SQLite connection.
+        """
+        with self._lock:
+            self._connection.close()
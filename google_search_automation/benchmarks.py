@@ -0,0 +1,369 @@
+from datetime import datetime
+import statistics
+import platform
+import tempfile
+import argparse
+import logging
+import random
+import json
+import re
+import time
+import sys
+import os
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Title fragments for the synthetic corpus: every spelling of the search term the relevance check has to accept,
+# plus accents, other scripts and punctuation that normalize_title has to strip or keep.
+TITLE_WORDS = [
+    "Domino's", "Domino’s", "DOMINOS", "dominos", "Dominoʼs", "דומינו'ס", "Pizza", "pízza", "Crust", "crème",
+    "Review", "Taste-Test", "#shorts", "🍕", "ＰＩＺＺＡ", "Hut", "vs.", "Papa", "John's", "(Official)", "2024",
+    "Ελληνικά", "Пицца", "ピザ", "—", "|", "!!!", "new", "menu", "order", "online",
+]
+
+
+def measure(function, repeat):
+    """
+    Input:
+        - function: Callable to time, called without arguments
+        - repeat: Number of timed calls (int)
+    Output: (list) - Duration of every call in milliseconds
+    Description: Times a callable after one untimed warm-up call.
+    """
+    function()
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+def summarize(durations, value, unit, higher_is_better, **extra):
+    """
+    Input:
+        - durations: Call durations in milliseconds (list)
+        - value: The benchmark's headline number, compared against the baseline (float)
+        - unit: Unit of value (str)
+        - higher_is_better: Whether a larger value is an improvement (bool)
+        - extra: Additional fields stored with the result
+    Output: (dict) - Benchmark result
+    Description: Builds one benchmark entry of the JSON report.
+    """
+    ordered = sorted(durations)
+    return dict(
+        value=value,
+        unit=unit,
+        higher_is_better=higher_is_better,
+        median_ms=statistics.median(ordered),
+        p95_ms=ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        min_ms=ordered[0],
+        runs=len(ordered),
+        **extra
+    )
+
+
+def title_corpus(size, seed=2108):
+    """
+    Input:
+        - size: Number of titles (int)
+        - seed: Random seed, so every run benchmarks the same corpus (int)
+    Output: (list) - Synthetic video titles
+    Description: Builds a reproducible corpus of 3 to 12 word titles from TITLE_WORDS.
+    """
+    rng = random.Random(seed)
+    return [' '.join(rng.choices(TITLE_WORDS, k=rng.randint(3, 12))) for _ in range(size)]
+
+
+def with_sponsored_ads(html, count=4):
+    """
+    Input:
+        - html: A search results page (str)
+        - count: Number of ads to add (int)
+    Output: (str) - The page with a block of text ads at the top of the body
+    Description: None of the snapshots was taken with ads shown, so the sponsored extractor is benchmarked on synthetic ads
+    built like Google's: a div[data-text-ad] holding the ad link and its heading, inside the results page markup.
+    """
+    ads = ''.join(
+        f'<div data-text-ad="1"><a href="https://www.dominos{index}.example.com/order?utm_source=ads">'
+        f'<div role="heading" aria-level="3">Domino\'s Pizza Delivery {index} | Order Online Now</div>'
+        f'<span>Sponsored</span></a><div>Hot pizza delivered fast. Deals and coupons in your area.</div></div>'
+        for index in range(count)
+    )
+    return re.sub(r'<body[^>]*>', lambda match: f'{match.group(0)}<div id="tads" aria-label="Ads">{ads}</div>', html, count=1)
+
+
+def bench_normalize_title(scale, repeat):
+    """
+    Input:
+        - scale: Multiplier of the corpus size (float)
+        - repeat: Number of timed runs (int)
+    Output: (dict) - Titles normalized per second
+    Description: normalize_title over a large title corpus.
+    """
+    from test_google_search import normalize_title
+    titles = title_corpus(int(20000 * scale))
+    durations = measure(lambda: [normalize_title(title) for title in titles], repeat)
+    return summarize(durations, len(titles) / (statistics.median(durations) / 1000), 'titles/s', True, titles=len(titles))
+
+
+def bench_relevance_score_all(scale, repeat):
+    """
+    Input:
+        - scale: Multiplier of the corpus size (float)
+        - repeat: Number of timed runs (int)
+    Output: (dict) - Titles scored per second
+    Description: RelevanceScorer.score_all with the query and aliases of the video relevance test.
+    """
+    from test_google_search import VIDEO_RELEVANCE_QUERY
+    from search_page import VIDEO_RELEVANCE_ALIASES
+    from relevance import RelevanceScorer
+    titles = title_corpus(int(20000 * scale))
+    scorer = RelevanceScorer(VIDEO_RELEVANCE_QUERY, aliases=VIDEO_RELEVANCE_ALIASES)
+    durations = measure(lambda: scorer.score_all(titles), repeat)
+    return summarize(durations, len(titles) / (statistics.median(durations) / 1000), 'titles/s', True, titles=len(titles))
+
+
+def bench_dom_extract(scale, repeat):
+    """
+    Input:
+        - scale: Unused, the snapshots have a fixed size (float)
+        - repeat: Number of timed extractions per snapshot (int)
+    Output: (dict) - One result per extractor, keyed 'dom_extract:<kind>'
+    Description: extract_results on the checked-in snapshots, loaded with set_content in a context that aborts every request.
+    The sponsored extractor runs on the videos snapshot with synthetic ads added (with_sponsored_ads), since no snapshot has ads.
+    The cache is dropped before each call, so every call pays the evaluate_all round trip.
+    """
+    from playwright.sync_api import sync_playwright
+    from dom_extract import extract_results, invalidate, SPONSORED, VIDEOS
+    results = {}
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        try:
+            context = browser.new_context()
+            context.route("**/*", lambda route: route.abort())
+            page = context.new_page()
+            for kind, snapshot, prepare in ((SPONSORED, 'videos_tab_page.html', with_sponsored_ads),
+                                            (VIDEOS, 'videos_tab_page.html', None)):
+                with open(os.path.join(SNAPSHOT_DIR, snapshot), encoding='utf-8') as f:
+                    html = f.read()
+                page.set_content(prepare(html) if prepare else html, wait_until='domcontentloaded')
+                records = []
+
+                def extract():
+                    invalidate(page)
+                    records[:] = extract_results(page, kind)
+
+                durations = measure(extract, repeat)
+                if not records:
+                    raise RuntimeError(f"The {kind} extractor found nothing in {snapshot}")
+                results[f'dom_extract:{kind}'] = summarize(
+                    durations, statistics.median(durations), 'ms', False, snapshot=snapshot, records=len(records)
+                )
+        finally:
+            browser.close()
+    return results
+
+
+def bench_save_test_result(scale, repeat):
+    """
+    Input:
+        - scale: Multiplier of the number of results (float)
+        - repeat: Number of timed runs (int)
+    Output: (dict) - Results persisted per second
+    Description: save_test_result into a fresh local SQLite store (DB_SAVE_MODE=3), including the final flush when the recorder closes.
+    """
+    import result_recorder
+    from test_google_search import save_test_result
+    from timing import span
+    count = int(2000 * scale)
+    overrides = {'DB_SAVE_MODE': '3', 'RESULT_FLUSH_INTERVAL': '0', 'RESULT_WRITE_MODE': 'wait'}
+    saved = {name: os.environ.get(name) for name in list(overrides) + ['SQLITE_PATH', 'SQLITE_SYNC_MODE']}
+    os.environ.update(overrides)
+    os.environ.pop('SQLITE_SYNC_MODE', None)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            runs = iter(range(repeat + 1))
+
+            def save_all():
+                os.environ['SQLITE_PATH'] = os.path.join(directory, f'results_{next(runs)}.sqlite3')
+                for index in range(count):
+                    with span('benchmark:step'):
+                        pass
+                    save_test_result(f'benchmark_{index % 10}', 'PASSED' if index % 7 else 'FAILED', 'Benchmark result.')
+                result_recorder.close_recorder()
+
+            durations = measure(save_all, repeat)
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    return summarize(durations, count / (statistics.median(durations) / 1000), 'results/s', True, results=count)
+
+
+def bench_fixture_startup(scale, repeat):
+    """
+    Input:
+        - scale: Unused (float)
+        - repeat: Number of timed start-ups (int)
+    Output: (dict) - Time from nothing to the Google home page on a pre-warmed context
+    Description: The path the browser, context_pool and page_with_results fixtures take before the search: launch Chromium,
+    pre-warm a context pool wired for snapshot replay and the resource filter, and open the home page up to the search box.
+    With BROWSER_WS_ENDPOINT (or --browser-ws) set, the launch phase attaches to that browser server instead, like the fixture does.
+    """
+    from playwright.sync_api import sync_playwright
+    from network_replay import install_network_mode, REPLAY
+    from resource_filter import ResourceFilter
+    from browser_pool import launch_or_connect, ContextPool
+    from search_page import LOCALE, USER_AGENT, SEARCH_INPUT_SELECTOR
+    endpoint = os.getenv('BROWSER_WS_ENDPOINT')
+    phases = {'launch': [], 'context_pool': [], 'home_page': []}
+    with tempfile.TemporaryDirectory() as directory:
+        missing_har = os.path.join(directory, 'none.har') # No HAR, so replay serves the HTML snapshots
+
+        def start_up():
+            resource_filter = ResourceFilter()
+
+            def setup(context):
+                install_network_mode(context, REPLAY, missing_har)
+                resource_filter.install(context)
+
+            with sync_playwright() as p:
+                started = time.perf_counter()
+                browser = launch_or_connect(p, endpoint)
+                launched = time.perf_counter()
+                pool = ContextPool(browser, size=1, context_options={'locale': LOCALE, 'user_agent': USER_AGENT},
+                                   setup=setup, storage_state=None)
+                warmed = time.perf_counter()
+                context, page = pool.acquire()
+                page.goto("https://www.google.com?hl=en", wait_until='domcontentloaded')
+                page.wait_for_selector(SEARCH_INPUT_SELECTOR, state='attached')
+                ready = time.perf_counter()
+                pool.close()
+                browser.close()
+            phases['launch'].append((launched - started) * 1000)
+            phases['context_pool'].append((warmed - launched) * 1000)
+            phases['home_page'].append((ready - warmed) * 1000)
+
+        durations = measure(start_up, repeat)
+    # Drop the warm-up call from the phases as well
+    breakdown = {f'{phase}_median_ms': statistics.median(values[1:]) for phase, values in phases.items()}
+    return summarize(durations, statistics.median(durations), 'ms', False, browser_server=endpoint, **breakdown)
+
+
+BENCHMARKS = {
+    'normalize_title': bench_normalize_title,
+    'relevance_score_all': bench_relevance_score_all,
+    'dom_extract': bench_dom_extract,
+    'save_test_result': bench_save_test_result,
+    'fixture_startup': bench_fixture_startup,
+}
+
+
+def run_benchmarks(names, scale=1.0, repeat=5):
+    """
+    Input:
+        - names: Benchmarks to run, keys of BENCHMARKS (iterable)
+        - scale: Multiplier of the workload sizes (float)
+        - repeat: Number of timed runs per benchmark (int)
+    Output: (dict) - JSON-serializable report with the environment and one entry per benchmark
+    Description: Runs the selected benchmarks. A benchmark that fails, e.g. because Chromium is not installed, is reported
+    with its error instead of stopping the others.
+    """
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': scale,
+        'repeat': repeat,
+        'benchmarks': {},
+    }
+    for name in names:
+        logger.info(f"Running benchmark '{name}'")
+        try:
+            result = BENCHMARKS[name](scale, repeat)
+        except Exception as e:
+            logger.error(f"Benchmark '{name}' failed: {str(e)}")
+            report['benchmarks'][name] = {'error': f"{type(e).__name__}: {str(e)}"}
+            continue
+        # Benchmarks that measure several things return one entry per thing.
+        if 'value' in result:
+            report['benchmarks'][name] = result
+        else:
+            report['benchmarks'].update(result)
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """
+    Input:
+        - report: Report of this run (dict)
+        - baseline: Stored report to compare against (dict)
+        - tolerance: Allowed relative slowdown before a result counts as a regression, e.g. 0.2 for 20% (float)
+    Output: (list) - Descriptions of the regressions
+    Description: Compares every benchmark present in both reports on its headline value. A benchmark that failed in this run
+    but has a value in the baseline is a regression too, so a broken benchmark cannot pass the gate.
+    """
+    regressions = []
+    previous_results = baseline.get('benchmarks', {})
+    for name, result in report['benchmarks'].items():
+        if 'error' in result:
+            # A failed benchmark is reported under its own name, even when it normally returns several entries.
+            measured = [key for key, previous in previous_results.items()
+                        if (key == name or key.startswith(f'{name}:')) and 'value' in previous]
+            if measured:
+                regressions.append(f"{name}: failed ({result['error']}), baseline has {', '.join(measured)}")
+            continue
+        previous = previous_results.get(name)
+        if not previous or 'value' not in previous or not previous['value']:
+            continue
+        change = (result['value'] - previous['value']) / previous['value']
+        if not result['higher_is_better']:
+            change = -change
+        result['change_vs_baseline'] = change
+        if change < -tolerance:
+            regressions.append(f"{name}: {previous['value']:.1f} -> {result['value']:.1f} {result['unit']} ({change:+.0%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the suite's hot paths offline and compare them against a stored baseline.")
+    parser.add_argument('names', nargs='*', help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiplier of the corpus and result counts")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+    parser.add_argument('--baseline', help="JSON report of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Relative slowdown that counts as a regression")
+    parser.add_argument('--browser-ws', default=os.getenv('BROWSER_WS_ENDPOINT'),
+                        help="Run fixture_startup against this browser server (python browser_pool.py) instead of launching Chromium")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(unknown)}")
+
+    # The suite logs every step at INFO, which would time the logging as much as the code; only this script's progress is shown.
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+    if args.browser_ws:
+        os.environ['BROWSER_WS_ENDPOINT'] = args.browser_ws
+    report = run_benchmarks(args.names or list(BENCHMARKS), args.scale, args.repeat)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report['regressions'] = regressions
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        logger.info(f"Wrote the benchmark report to {args.output}")
+    else:
+        print(output)
+    for regression in regressions:
+        logger.error(f"Regression: {regression}")
+    sys.exit(1 if regressions else 0)
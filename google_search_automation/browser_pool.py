@@ -0,0 +1,152 @@
+from queue import Queue, Empty
+import subprocess
+import argparse
+import tempfile
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORAGE_STATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.storage_state.json')
+
+
+def launch_or_connect(playwright, endpoint=None, headless=True):
+    """
+    Input:
+        - playwright: Playwright instance from sync_playwright()
+        - endpoint: DevTools endpoint of a running Chromium (http://host:port), or None to launch a local browser (str)
+        - headless: Launch without a window when no server is used (bool)
+    Output: Browser instance
+    Description: Attaches to a long-lived Chromium over CDP when an endpoint is given, which skips the Chromium start-up on every run,
+    and launches Chromium otherwise. Closing a browser attached this way only disconnects, so the process stays warm for the next run.
+    """
+    if endpoint:
+        logger.info(f"Connecting to the browser server at {endpoint}")
+        return playwright.chromium.connect_over_cdp(endpoint)
+    logger.info(f"Launching Chromium (headless={headless})")
+    return playwright.chromium.launch(headless=headless)
+
+
+class ContextPool:
+    """
+    Pre-warmed browser contexts, each with one open page.
+    Contexts are created from the saved storage state when there is one, so consent and locale
+    cookies are already set, and every context goes through the same setup callback (network mode,
+    resource filter). Acquiring a context only creates a new one when the pool is empty.
+    """
+
+    def __init__(self, browser, size=1, context_options=None, setup=None, storage_state=DEFAULT_STORAGE_STATE):
+        self.browser = browser
+        self.context_options = dict(context_options or {})
+        self.setup = setup
+        self.storage_state = storage_state
+        self._idle = Queue()
+        self._all = []
+        for _ in range(size):
+            self._idle.put(self._create())
+
+    def _create(self):
+        """
+        Input: None
+        Output: (tuple) - (BrowserContext, Page)
+        Description: Creates a context with one page, reusing the saved storage state if it exists.
+        """
+        options = dict(self.context_options)
+        if self.storage_state and os.path.exists(self.storage_state):
+            options['storage_state'] = self.storage_state
+        context = self.browser.new_context(**options)
+        if self.setup is not None:
+            self.setup(context)
+        page = context.new_page()
+        self._all.append(context)
+        return context, page
+
+    def acquire(self):
+        """
+        Input: None
+        Output: (tuple) - (BrowserContext, Page)
+        Description: Returns a pre-warmed context and page, creating one if none is idle.
+        """
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            logger.info("Context pool is empty, creating a new context")
+            return self._create()
+
+    def release(self, context, page):
+        """
+        Input:
+            - context: BrowserContext returned by acquire()
+            - page: Page returned by acquire()
+        Output: None
+        Description: Puts a context back for reuse. Its cookies and page are kept as they are.
+        """
+        self._idle.put((context, page))
+
+    def save_storage_state(self, context):
+        """
+        Input: context (BrowserContext)
+        Output: None
+        Description: Saves the context's cookies and local storage, so later contexts and later runs start with the consent and location choices already made.
+        """
+        if self.storage_state:
+            # Other pytest-xdist workers may be reading the file, so it is replaced in one step instead of rewritten in place.
+            temp_path = f"{self.storage_state}.{os.getpid()}.tmp"
+            context.storage_state(path=temp_path)
+            os.replace(temp_path, self.storage_state)
+            logger.info(f"Saved browser storage state to {self.storage_state}")
+
+    def close(self):
+        """
+        Input: None
+        Output: None
+        Description: Closes every context the pool created.
+        """
+        for context in self._all:
+            try:
+                context.close()
+            except Exception as e:
+                logger.warning(f"Failed to close browser context: {str(e)}")
+        self._all.clear()
+
+
+def run_browser_server(port=9222, host='127.0.0.1', headless=True):
+    """
+    Input:
+        - port: DevTools port to listen on (int)
+        - host: Interface to bind (str)
+        - headless: Run without a window (bool)
+    Output: None
+    Description: Runs one persistent Chromium with remote debugging until interrupted. Point BROWSER_WS_ENDPOINT (or --browser-ws)
+    at http://host:port to let consecutive test runs reuse it. `playwright run-server` is not used because it starts a new
+    browser for every client and closes it when the client disconnects, so nothing would stay warm between runs.
+    """
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as p:
+        executable = p.chromium.executable_path
+    with tempfile.TemporaryDirectory(prefix='browser-server-') as user_data_dir:
+        command = [
+            executable,
+            f'--remote-debugging-port={port}',
+            f'--remote-debugging-address={host}',
+            f'--user-data-dir={user_data_dir}',
+            '--no-first-run',
+            '--no-default-browser-check',
+        ]
+        if headless:
+            command.append('--headless=new')
+        logger.info(f"Starting Chromium with remote debugging on http://{host}:{port}")
+        subprocess.run(command + ['about:blank'], check=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Run a long-lived Chromium shared by consecutive test runs over the DevTools protocol.")
+    parser.add_argument('--port', type=int, default=9222)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--headed', action='store_true', help="Show the browser window")
+    args = parser.parse_args()
+    try:
+        run_browser_server(args.port, args.host, headless=not args.headed)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,212 @@
+import pytest
+import os
+from db_pool import close_pools
+from result_recorder import close_recorder
+from network_replay import NETWORK_MODES, LIVE, SNAPSHOT_DIR
+from http_client import client_from_env
+from resource_filter import ResourceFilter, DEFAULT_BLOCKED_TYPES, DEFAULT_DENY_DOMAINS
+from artifact_store import ArtifactStore, DEFAULT_PATH, new_run_id
+from search_page import SEARCH_QUERY
+from browser_pool import DEFAULT_STORAGE_STATE
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--network-mode",
+        choices=NETWORK_MODES,
+        default=os.getenv('NETWORK_MODE', LIVE),
+        help="live: use google.com, record: use google.com and save a HAR, replay: serve the HAR or the HTML snapshots offline"
+    )
+    parser.addoption(
+        "--har-path",
+        default=os.getenv('NETWORK_HAR', os.path.join(SNAPSHOT_DIR, 'search_session.har')),
+        help="HAR file written by --network-mode=record and read by --network-mode=replay"
+    )
+    parser.addoption(
+        "--no-resource-filter",
+        action="store_true",
+        default=os.getenv('RESOURCE_FILTER', '1') == '0',
+        help="Load every resource instead of aborting images, fonts, media and third-party trackers"
+    )
+    parser.addoption(
+        "--browser-ws",
+        default=os.getenv('BROWSER_WS_ENDPOINT'),
+        help="DevTools endpoint (http://host:port) of a running browser server (python browser_pool.py) to use instead of launching Chromium"
+    )
+    parser.addoption(
+        "--headed",
+        action="store_true",
+        default=os.getenv('HEADLESS', '1') == '0',
+        help="Show the browser window; headless is the default"
+    )
+    parser.addoption(
+        "--storage-state",
+        default=os.getenv('STORAGE_STATE', DEFAULT_STORAGE_STATE),
+        help="File holding the cookies (consent, location) reused by new browser contexts; empty to disable"
+    )
+    parser.addoption(
+        "--context-pool-size",
+        type=int,
+        default=int(os.getenv('CONTEXT_POOL_SIZE', '1')),
+        help="Number of browser contexts created up front"
+    )
+    parser.addoption(
+        "--artifact-store",
+        default=os.getenv('ARTIFACT_STORE', DEFAULT_PATH),
+        help="SQLite file holding the values tests hand to each other"
+    )
+    parser.addoption(
+        "--artifact-wait",
+        type=float,
+        default=float(os.getenv('ARTIFACT_WAIT', '0')),
+        help="Seconds a test waits for a required artifact from another worker before it is skipped (use with pytest-xdist)"
+    )
+    parser.addoption(
+        "--artifact-retention-days",
+        type=float,
+        default=float(os.getenv('ARTIFACT_RETENTION_DAYS', '7')),
+        help="Artifacts of runs older than this many days are deleted from the artifact store at the start of a session"
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "resource_filter(block_types=None, deny_domains=None, allow_domains=()): override the resource filter rules for one test"
+    )
+    config.addinivalue_line(
+        "markers",
+        "requires_artifacts(*names, query=SEARCH_QUERY, any_of=False): skip the test unless earlier tests stored these artifacts "
+        "(with any_of=True, at least one of them)"
+    )
+    # pytest-xdist workers inherit the controller's run id so they share one set of artifacts.
+    workerinput = getattr(config, 'workerinput', None)
+    config.artifact_run_id = workerinput['artifact_run_id'] if workerinput else new_run_id()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    node.workerinput['artifact_run_id'] = node.config.artifact_run_id
+
+
+@pytest.fixture(scope="session")
+def artifacts(pytestconfig):
+    """
+    Input: pytestconfig (pytest Config)
+    Output: ArtifactStore instance for this run
+    Description: Process-safe store for the values tests hand to each other, shared by every pytest-xdist worker of the run.
+    Artifacts of old runs are purged when the store is opened, so the file does not grow without bound.
+    """
+    store = ArtifactStore(pytestconfig.artifact_run_id, pytestconfig.getoption("--artifact-store"))
+    store.purge(pytestconfig.getoption("--artifact-retention-days") * 24 * 3600)
+    yield store
+    store.close()
+
+
+@pytest.fixture(autouse=True)
+def required_artifacts(request, pytestconfig):
+    """
+    Input:
+        - request: pytest FixtureRequest
+        - pytestconfig: pytest Config
+    Output: (dict) - The artifacts named by the test's requires_artifacts marker
+    Description: Waits up to --artifact-wait seconds for each declared artifact and skips the test if one is missing.
+    With any_of=True only the ones that were stored are returned, and the test is skipped when none was.
+    """
+    marker = request.node.get_closest_marker("requires_artifacts")
+    if marker is None:
+        return {}
+    store = request.getfixturevalue("artifacts")
+    query = marker.kwargs.get('query', SEARCH_QUERY)
+    any_of = marker.kwargs.get('any_of', False)
+    values = {}
+    for name in marker.args:
+        value = store.wait_for(query, name, timeout=pytestconfig.getoption("--artifact-wait"))
+        if value is None:
+            if any_of:
+                continue
+            pytest.skip(f"Skipping {request.node.name} because no '{name}' was stored by a previous test.")
+        values[name] = value
+    if not values:
+        pytest.skip(f"Skipping {request.node.name} because none of {', '.join(marker.args)} was stored by a previous test.")
+    return values
+
+
+@pytest.fixture(scope="session")
+def network_mode(pytestconfig):
+    """
+    Input: pytestconfig (pytest Config)
+    Output: (str) - 'live', 'record' or 'replay'
+    Description: Returns the network mode selected with --network-mode or the NETWORK_MODE environment variable.
+    """
+    return pytestconfig.getoption("--network-mode")
+
+
+@pytest.fixture(scope="session")
+def har_path(pytestconfig):
+    """
+    Input: pytestconfig (pytest Config)
+    Output: (str) - Path of the HAR file used by record and replay modes
+    Description: Returns the HAR path selected with --har-path or the NETWORK_HAR environment variable.
+    """
+    return pytestconfig.getoption("--har-path")
+
+
+@pytest.fixture(scope="session")
+def resource_filter(pytestconfig):
+    """
+    Input: pytestconfig (pytest Config)
+    Output: ResourceFilter instance, or None when filtering is disabled
+    Description: Creates the request filter shared by the browser context and logs how much it blocked at the end of the session.
+    """
+    if pytestconfig.getoption("--no-resource-filter"):
+        yield None
+        return
+    resource_filter = ResourceFilter()
+    yield resource_filter
+    resource_filter.report()
+
+
+@pytest.fixture(autouse=True)
+def resource_filter_rules(request, resource_filter):
+    """
+    Input:
+        - request: pytest FixtureRequest
+        - resource_filter: ResourceFilter instance or None
+    Output: None
+    Description: Applies the rules from the test's resource_filter marker, using the defaults for the options it does not set.
+    An explicitly empty option (e.g. block_types=()) disables that rule instead of falling back to the default.
+    """
+    if resource_filter is None:
+        return
+    marker = request.node.get_closest_marker("resource_filter")
+    rules = marker.kwargs if marker else {}
+    resource_filter.configure(
+        block_types=rules.get('block_types', DEFAULT_BLOCKED_TYPES),
+        deny_domains=rules.get('deny_domains', DEFAULT_DENY_DOMAINS),
+        allow_domains=rules.get('allow_domains', ())
+    )
+
+
+@pytest.fixture(scope="session")
+def http_client():
+    """
+    Input: None
+    Output: HttpClient instance
+    Description: Shared HTTP client with pooled connections, timeouts, retries and a per-URL response cache for the whole session.
+    """
+    client = client_from_env()
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def db_pools():
+    """
+    Input: None
+    Output: None
+    Description: Keeps the shared PostgreSQL and Oracle pools alive for the whole pytest session. At session teardown it flushes the buffered test results and then releases every pooled connection.
+    """
+    yield
+    close_recorder()
+    close_pools()
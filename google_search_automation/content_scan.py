@@ -0,0 +1,153 @@
+from collections import deque
+from timing import span
+import codecs
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TermMatcher:
+    """
+    Aho-Corasick automaton that finds any number of terms in one pass over a text.
+    The automaton state is carried from one feed() call to the next, so a term split across
+    two chunks is still found.
+    """
+
+    def __init__(self, terms, case_sensitive=True):
+        if not terms:
+            raise ValueError("TermMatcher needs at least one term")
+        self.terms = list(terms)
+        self.case_sensitive = case_sensitive
+        self._goto = [{}]    # state -> {character: next state}
+        self._fail = [0]     # state -> longest proper suffix state
+        self._output = [set()] # state -> indexes of the terms that end here
+        for index, term in enumerate(self.terms):
+            self._add(self._fold(term), index)
+        self._build_failure_links()
+        self.state = 0
+
+    def _fold(self, text):
+        """
+        Input: text (str)
+        Output: (str) - text, case-folded unless matching is case sensitive
+        Description: Normalizes text the same way for the terms and the scanned content.
+        """
+        return text if self.case_sensitive else text.casefold()
+
+    def _add(self, term, index):
+        """
+        Input:
+            - term: Folded term (str)
+            - index: Position of the term in self.terms (int)
+        Output: None
+        Description: Adds a term to the trie.
+        """
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(index)
+
+    def _build_failure_links(self):
+        """
+        Input: None
+        Output: None
+        Description: Computes the failure link of every trie state breadth-first and merges the outputs reachable through it.
+        """
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def feed(self, text):
+        """
+        Input: text (str) - Next piece of the text being scanned
+        Output: (set) - Indexes of the terms that end inside this piece
+        Description: Advances the automaton over text and reports the terms it completes.
+        """
+        found = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = self.state
+        for char in self._fold(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        self.state = state
+        return found
+
+
+def scan_stream(chunks, terms, require_all=False, max_bytes=5 * 1024 * 1024, encoding='utf-8', case_sensitive=True):
+    """
+    Input:
+        - chunks: Iterable of byte chunks, e.g. response.iter_content(...)
+        - terms: Terms to look for (list of str)
+        - require_all: Stop once every term is found instead of once any term is found (bool)
+        - max_bytes: Stop reading after this many bytes (int)
+        - encoding: Character encoding of the bytes (str)
+        - case_sensitive: Whether matching is case sensitive (bool)
+    Output: (dict) - {'found': terms that were found, 'bytes_read': bytes consumed, 'truncated': True if max_bytes was hit first}
+    Description: Decodes the chunks incrementally and matches all terms in one pass, stopping as soon as the required terms are found or the byte cap is reached.
+    """
+    matcher = TermMatcher(terms, case_sensitive)
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    found = set()
+    needed = len(matcher.terms) if require_all else 1
+    bytes_read = 0
+    truncated = False
+    for chunk in chunks:
+        if bytes_read + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - bytes_read]
+            truncated = True
+        bytes_read += len(chunk)
+        found |= matcher.feed(decoder.decode(chunk))
+        if len(found) >= needed:
+            truncated = False
+            break
+        if truncated:
+            break
+    else:
+        found |= matcher.feed(decoder.decode(b'', final=True))
+    return {
+        'found': [matcher.terms[index] for index in sorted(found)],
+        'bytes_read': bytes_read,
+        'truncated': truncated,
+    }
+
+
+def scan_response(response, terms, require_all=False, max_bytes=5 * 1024 * 1024, chunk_size=16 * 1024, case_sensitive=True):
+    """
+    Input:
+        - response: requests.Response, ideally fetched with stream=True
+        - terms, require_all, max_bytes, case_sensitive: See scan_stream
+        - chunk_size: Bytes read per chunk (int)
+    Output: (dict) - See scan_stream
+    Description: Scans a response body without loading it whole and closes the response afterwards, so the rest of the download is abandoned.
+    """
+    with span('http_scan'):
+        try:
+            result = scan_stream(
+                response.iter_content(chunk_size=chunk_size),
+                terms,
+                require_all=require_all,
+                max_bytes=max_bytes,
+                encoding=response.encoding or 'utf-8',
+                case_sensitive=case_sensitive
+            )
+        finally:
+            response.close()
+    logger.info(f"Scanned {result['bytes_read']} bytes of {response.url}, found {result['found']}" + (" (byte cap reached)" if result['truncated'] else ""))
+    return result
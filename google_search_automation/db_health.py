@@ -0,0 +1,105 @@
+import threading
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'        # Backend is healthy, writes go through
+OPEN = 'open'            # Backend is failing, writes are skipped or spooled without trying to connect
+HALF_OPEN = 'half-open'  # Backoff elapsed, a single probe write is allowed through
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of one result database so an unreachable backend fails fast instead of
+    costing a full connect timeout on every write.
+    After failure_threshold consecutive failures the breaker opens. Once the backoff delay has
+    passed it lets one probe through; a successful probe closes it again, a failed probe reopens
+    it with the delay doubled up to max_reset_timeout.
+    """
+
+    def __init__(self, name, failure_threshold=2, reset_timeout=30.0, max_reset_timeout=300.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._current_timeout = reset_timeout
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """
+        Input: None
+        Output: (bool) - True if the caller may try the backend now
+        Description: Returns False while the breaker is open and its backoff has not elapsed. When the backoff elapses the breaker moves to half-open and admits exactly one probe.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self._current_timeout:
+                self.state = HALF_OPEN
+                logger.info(f"{self.name} circuit half-open, probing the backend")
+                return True
+            return False
+
+    def record_success(self):
+        """
+        Input: None
+        Output: None
+        Description: Marks the backend healthy and resets the failure count and backoff.
+        """
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"{self.name} circuit closed, backend is reachable again")
+            self.state = CLOSED
+            self._failures = 0
+            self._current_timeout = self.reset_timeout
+
+    def record_failure(self):
+        """
+        Input: None
+        Output: None
+        Description: Counts a failed call and opens the breaker once the threshold is reached. A failed half-open probe reopens it with a longer backoff.
+        """
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN:
+                self._current_timeout = min(self._current_timeout * 2, self.max_reset_timeout)
+            elif self._failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            logger.warning(f"{self.name} circuit open, skipping the backend for {self._current_timeout:.0f}s")
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(backend):
+    """
+    Input: backend (str) - Name of the backend, e.g. 'PostgreSQL' or 'Oracle'
+    Output: CircuitBreaker instance
+    Description: Returns the process-wide breaker for a backend, configured from DB_BREAKER_THRESHOLD, DB_BREAKER_RESET and DB_BREAKER_MAX_RESET.
+    """
+    with _breakers_lock:
+        if backend not in _breakers:
+            _breakers[backend] = CircuitBreaker(
+                backend,
+                failure_threshold=int(os.getenv('DB_BREAKER_THRESHOLD', '2')),
+                reset_timeout=float(os.getenv('DB_BREAKER_RESET', '30')),
+                max_reset_timeout=float(os.getenv('DB_BREAKER_MAX_RESET', '300'))
+            )
+        return _breakers[backend]
+
+
+def connect_timeout():
+    """
+    Input: None
+    Output: (int) - Connect timeout in seconds
+    Description: Returns the connect timeout used for new database connections, read from DB_CONNECT_TIMEOUT.
+    """
+    return int(os.getenv('DB_CONNECT_TIMEOUT', '3'))
@@ -0,0 +1,176 @@
+from contextlib import contextmanager
+import threading
+import logging
+import os
+from db_health import connect_timeout
+
+logger = logging.getLogger(__name__)
+
+# Pools are created lazily on first use and shared by every caller in the process.
+# The drivers are imported there too, so modes that never touch a backend do not need its client library.
+_postgres_pool = None
+_oracle_pool = None
+_pool_lock = threading.Lock()
+
+
+def _pool_size(prefix):
+    """
+    Input: prefix (str) - 'POSTGRES' or 'ORACLE'
+    Output: (tuple) - (min_size, max_size)
+    Description: Reads the pool size for a backend from environment variables, falling back to the shared DB_POOL_MIN / DB_POOL_MAX values.
+    """
+    min_size = int(os.getenv(f'{prefix}_POOL_MIN', os.getenv('DB_POOL_MIN', '1')))
+    max_size = int(os.getenv(f'{prefix}_POOL_MAX', os.getenv('DB_POOL_MAX', '4')))
+    if min_size < 0 or max_size < 1 or min_size > max_size:
+        raise ValueError(f"Invalid {prefix} pool size: min={min_size}, max={max_size}")
+    return min_size, max_size
+
+
+def get_postgres_pool():
+    """
+    Input: None
+    Output: psycopg2 ThreadedConnectionPool
+    Description: Returns the shared PostgreSQL connection pool, creating it on first call using environment variables for the configuration.
+    """
+    global _postgres_pool
+    with _pool_lock:
+        if _postgres_pool is None:
+            from psycopg2 import pool as pg_pool
+            min_size, max_size = _pool_size('POSTGRES')
+            logger.info(f"Creating PostgreSQL connection pool (min={min_size}, max={max_size})")
+            _postgres_pool = pg_pool.ThreadedConnectionPool(
+                min_size,
+                max_size,
+                dbname=os.getenv('POSTGRES_DBNAME', 'postgres'), # Get the database name from environment variables
+                user=os.getenv('POSTGRES_USER', 'postgres'), # Get the user name from environment variables
+                password=os.getenv('POSTGRES_PASSWORD', 'Roni2108'), # Get the password from environment variables
+                host=os.getenv('POSTGRES_HOST', 'localhost'), # Get the database host from environment variables
+                port=int(os.getenv('POSTGRES_PORT', '5432')), # Get the database port from environment variables
+                connect_timeout=connect_timeout() # Fail fast when the server is unreachable
+            )
+        return _postgres_pool
+
+
+def oracle_dsn():
+    """
+    Input: None
+    Output: (str) - Oracle connect descriptor
+    Description: Builds the Oracle connect descriptor from environment variables. Unlike cx_Oracle.makedsn it sets CONNECT_TIMEOUT and TRANSPORT_CONNECT_TIMEOUT, so an unreachable host fails within DB_CONNECT_TIMEOUT seconds.
+    """
+    timeout = connect_timeout()
+    return (
+        f"(DESCRIPTION=(CONNECT_TIMEOUT={timeout})(TRANSPORT_CONNECT_TIMEOUT={timeout})(RETRY_COUNT=0)"
+        f"(ADDRESS=(PROTOCOL=TCP)(HOST={os.getenv('ORACLE_HOST', 'localhost')})(PORT={int(os.getenv('ORACLE_PORT', '1521'))}))"
+        f"(CONNECT_DATA=(SERVICE_NAME={os.getenv('ORACLE_DBNAME', 'xe')})))"
+    )
+
+
+def get_oracle_pool():
+    """
+    Input: None
+    Output: cx_Oracle SessionPool
+    Description: Returns the shared Oracle session pool, creating it on first call using environment variables for the configuration.
+    """
+    global _oracle_pool
+    with _pool_lock:
+        if _oracle_pool is None:
+            import cx_Oracle
+            min_size, max_size = _pool_size('ORACLE')
+            logger.info(f"Creating Oracle session pool (min={min_size}, max={max_size})")
+            dsn = oracle_dsn()
+            _oracle_pool = cx_Oracle.SessionPool(
+                user=os.getenv('ORACLE_USER', 'system'), # Get the Oracle user name from environment variables
+                password=os.getenv('ORACLE_PASSWORD', 'Roni2108'), # Get the Oracle password from environment variables
+                dsn=dsn,
+                min=min_size,
+                max=max_size,
+                increment=1,
+                threaded=True,
+                getmode=cx_Oracle.SPOOL_ATTRVAL_WAIT, # Block instead of failing when every session is busy
+                encoding="UTF-8"
+            )
+        return _oracle_pool
+
+
+def clob_as_string(cursor, name, default_type, size, precision, scale):
+    """
+    Output type handler for cx_Oracle cursors that fetches CLOB columns (test_results.details) as strings.
+    The values are then array-fetched with the other columns instead of being read LOB by LOB, and stay valid after the
+    session is released to the pool, unlike LOB locators.
+    """
+    import cx_Oracle
+    if default_type == cx_Oracle.DB_TYPE_CLOB:
+        return cursor.var(cx_Oracle.DB_TYPE_LONG, arraysize=cursor.arraysize)
+
+
+def _safe_rollback(connection):
+    """
+    Input: connection - psycopg2 or cx_Oracle connection object
+    Output: None
+    Description: Rolls back the current transaction, ignoring errors from connections that are already broken so the original exception is not masked.
+    """
+    try:
+        connection.rollback()
+    except Exception as e:
+        logger.warning(f"Rollback failed: {str(e)}")
+
+
+@contextmanager
+def postgres_connection():
+    """
+    Input: None
+    Output: psycopg2 connection object (context manager)
+    Description: Borrows a connection from the PostgreSQL pool and returns it to the pool when the block exits. Uncommitted work is rolled back if the block raises.
+    """
+    pool = get_postgres_pool()
+    connection = pool.getconn()
+    try:
+        yield connection
+    except Exception:
+        _safe_rollback(connection)
+        raise
+    finally:
+        # Connections that were broken by the server are discarded instead of being reused.
+        pool.putconn(connection, close=bool(connection.closed))
+
+
+@contextmanager
+def oracle_connection():
+    """
+    Input: None
+    Output: cx_Oracle connection object (context manager)
+    Description: Acquires a session from the Oracle pool and releases it back to the pool when the block exits. Uncommitted work is rolled back if the block raises.
+    """
+    pool = get_oracle_pool()
+    connection = pool.acquire()
+    try:
+        yield connection
+    except Exception:
+        _safe_rollback(connection)
+        raise
+    finally:
+        pool.release(connection)
+
+
+def close_pools():
+    """
+    Input: None
+    Output: None
+    Description: Closes every pool that was created in this process. Safe to call more than once.
+    """
+    global _postgres_pool, _oracle_pool
+    with _pool_lock:
+        if _postgres_pool is not None:
+            logger.info("Closing PostgreSQL connection pool")
+            try:
+                _postgres_pool.closeall()
+            except Exception as e:
+                logger.error(f"Failed to close PostgreSQL connection pool: {str(e)}")
+            _postgres_pool = None
+        if _oracle_pool is not None:
+            logger.info("Closing Oracle session pool")
+            try:
+                _oracle_pool.close(force=True)
+            except Exception as e:
+                logger.error(f"Failed to close Oracle session pool: {str(e)}")
+            _oracle_pool = None
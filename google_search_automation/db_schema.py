@@ -0,0 +1,140 @@
+from db_pool import postgres_connection, oracle_connection, close_pools
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Objects this suite adds next to the existing test_results tables.
+# test_step_timings rows belong to the test_results row with the same test_name and timestamp/test_time.
+# test_results.ingested_at is set by the database when a row arrives, so analytics.py and export_results.py can pick up
+# rows by arrival even when they carry an older test time (spool replay, SQLite sync).
+# test_daily_summary, test_summary_state and test_summary_watermark are maintained by analytics.py.
+# The result recorder also creates test_step_timings by itself the first time it finds the table missing.
+STEP_TIMINGS_POSTGRES_DDL = """
+    CREATE TABLE IF NOT EXISTS test_step_timings (
+        test_name TEXT NOT NULL,
+        timestamp TIMESTAMP NOT NULL,
+        step TEXT NOT NULL,
+        duration_ms DOUBLE PRECISION NOT NULL
+    )
+"""
+
+STEP_TIMINGS_ORACLE_DDL = """
+    CREATE TABLE test_step_timings (
+        test_name VARCHAR2(255) NOT NULL,
+        test_time TIMESTAMP NOT NULL,
+        step VARCHAR2(255) NOT NULL,
+        duration_ms NUMBER NOT NULL
+    )
+"""
+
+POSTGRES_DDL = [
+    STEP_TIMINGS_POSTGRES_DDL,
+    "CREATE INDEX IF NOT EXISTS test_step_timings_step_idx ON test_step_timings (step, timestamp)",
+    "CREATE INDEX IF NOT EXISTS test_step_timings_name_time_idx ON test_step_timings (test_name, timestamp)",
+    "CREATE INDEX IF NOT EXISTS test_results_name_time_idx ON test_results (test_name, timestamp)",
+    "ALTER TABLE test_results ADD COLUMN IF NOT EXISTS ingested_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC')",
+    "CREATE INDEX IF NOT EXISTS test_results_ingested_idx ON test_results (ingested_at)",
+    """
+    CREATE TABLE IF NOT EXISTS test_daily_summary (
+        test_name TEXT NOT NULL,
+        run_day DATE NOT NULL,
+        runs INTEGER NOT NULL,
+        passes INTEGER NOT NULL,
+        flips INTEGER NOT NULL,
+        PRIMARY KEY (test_name, run_day)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS test_summary_state (
+        test_name TEXT PRIMARY KEY,
+        last_time TIMESTAMP NOT NULL,
+        last_status TEXT NOT NULL,
+        runs INTEGER NOT NULL,
+        fail_streak INTEGER NOT NULL,
+        longest_fail_streak INTEGER NOT NULL
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS test_summary_watermark (ingested_until TIMESTAMP NOT NULL)",
+]
+
+ORACLE_DDL = [
+    STEP_TIMINGS_ORACLE_DDL,
+    "CREATE INDEX test_step_timings_step_idx ON test_step_timings (step, test_time)",
+    "CREATE INDEX test_step_timings_name_time_idx ON test_step_timings (test_name, test_time)",
+    "CREATE INDEX test_results_name_time_idx ON test_results (test_name, test_time)",
+    "ALTER TABLE test_results ADD (ingested_at TIMESTAMP DEFAULT SYS_EXTRACT_UTC(SYSTIMESTAMP) NOT NULL)",
+    "CREATE INDEX test_results_ingested_idx ON test_results (ingested_at)",
+    """
+    CREATE TABLE test_daily_summary (
+        test_name VARCHAR2(255) NOT NULL,
+        run_day DATE NOT NULL,
+        runs NUMBER NOT NULL,
+        passes NUMBER NOT NULL,
+        flips NUMBER NOT NULL,
+        PRIMARY KEY (test_name, run_day)
+    )
+    """,
+    """
+    CREATE TABLE test_summary_state (
+        test_name VARCHAR2(255) PRIMARY KEY,
+        last_time TIMESTAMP NOT NULL,
+        last_status VARCHAR2(50) NOT NULL,
+        runs NUMBER NOT NULL,
+        fail_streak NUMBER NOT NULL,
+        longest_fail_streak NUMBER NOT NULL
+    )
+    """,
+    "CREATE TABLE test_summary_watermark (ingested_until TIMESTAMP NOT NULL)",
+]
+
+# ORA-00955: name is already used by an existing object; ORA-01408: such column list already indexed;
+# ORA-01430: column being added already exists in table
+ORACLE_ALREADY_EXISTS = (955, 1408, 1430)
+
+
+def apply_postgres_schema():
+    """
+    Input: None
+    Output: None
+    Description: Creates the suite's tables and indexes in PostgreSQL if they do not exist yet.
+    """
+    with postgres_connection() as connection:
+        cursor = connection.cursor()
+        for statement in POSTGRES_DDL:
+            cursor.execute(statement)
+        connection.commit()
+        cursor.close()
+    logger.info("PostgreSQL schema is up to date")
+
+
+def apply_oracle_schema():
+    """
+    Input: None
+    Output: None
+    Description: Creates the suite's tables and indexes in Oracle, skipping the ones that already exist.
+    """
+    with oracle_connection() as connection:
+        cursor = connection.cursor()
+        for statement in ORACLE_DDL:
+            try:
+                cursor.execute(statement)
+            except Exception as e:
+                error = e.args[0] if e.args else None
+                if getattr(error, 'code', None) not in ORACLE_ALREADY_EXISTS:
+                    raise
+        cursor.close()
+    logger.info("Oracle schema is up to date")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Create the tables and indexes used by the test suite.")
+    parser.add_argument('--backend', choices=['postgres', 'oracle', 'both'], default='both')
+    args = parser.parse_args()
+
+    if args.backend in ('postgres', 'both'):
+        apply_postgres_schema()
+    if args.backend in ('oracle', 'both'):
+        apply_oracle_schema()
+    close_pools()
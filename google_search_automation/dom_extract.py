@@ -0,0 +1,98 @@
+from weakref import WeakKeyDictionary
+from search_page import SPONSORED_SELECTOR, YOUTUBE_LINK_SELECTOR
+import logging
+
+logger = logging.getLogger(__name__)
+
+SPONSORED = 'sponsored'
+VIDEOS = 'videos'
+
+# Selector whose matches are extracted, and the script that turns all of them into records in one browser round trip.
+# Each script receives the matched elements and returns a list of {href, title, domain, position} objects.
+EXTRACTORS = {
+    SPONSORED: (
+        SPONSORED_SELECTOR,
+        """
+        (elements) => elements.map((element, position) => {
+            const link = element.querySelector('a[href]');
+            const heading = element.querySelector('[role="heading"], h3');
+            const href = link ? link.href : null;
+            let domain = null;
+            try { domain = href ? new URL(href).hostname : null; } catch (e) {}
+            return {
+                href: href,
+                title: heading ? heading.innerText.trim() : null,
+                domain: domain,
+                position: position,
+            };
+        })
+        """,
+    ),
+    VIDEOS: (
+        YOUTUBE_LINK_SELECTOR,
+        """
+        (elements) => elements.map((element, position) => {
+            const heading = element.querySelector('h3, span[aria-label], div[aria-label]');
+            const href = element.getAttribute('href');
+            let domain = null;
+            try { domain = new URL(href, document.baseURI).hostname; } catch (e) {}
+            return {
+                href: href,
+                title: heading ? heading.innerText.trim() : null,
+                domain: domain,
+                position: position,
+            };
+        })
+        """,
+    ),
+}
+
+# Per-page cache: page -> {kind: records}. Cleared whenever the page's main frame navigates.
+_cache = WeakKeyDictionary()
+
+
+def _forget_on_navigation(page):
+    """
+    Input: page (Playwright Page)
+    Output: (dict) - The cache entry for the page
+    Description: Creates the cache entry for a page and clears it whenever the main frame navigates, so stale records are never returned.
+    """
+    entry = {}
+
+    def on_navigated(frame):
+        if frame == page.main_frame:
+            entry.clear()
+
+    page.on("framenavigated", on_navigated)
+    _cache[page] = entry
+    return entry
+
+
+def extract_results(page, kind):
+    """
+    Input:
+        - page: Playwright Page showing Google search results
+        - kind: 'sponsored' or 'videos' (str)
+    Output: (list) - Records with href, title, domain and position keys, in page order
+    Description: Extracts every sponsored ad or video result in a single evaluate_all call.
+    The records are cached until the page navigates, so repeated calls cost no browser round trip.
+    """
+    entry = _cache.get(page)
+    if entry is None:
+        entry = _forget_on_navigation(page)
+    if kind not in entry:
+        selector, script = EXTRACTORS[kind]
+        entry[kind] = page.locator(selector).evaluate_all(script)
+        logger.info(f"Extracted {len(entry[kind])} {kind} result(s)")
+    return entry[kind]
+
+
+def invalidate(page):
+    """
+    Input: page (Playwright Page)
+    Output: None
+    Description: Drops the cached records of a page, for DOM changes that happen without a navigation.
+    """
+    entry = _cache.get(page)
+    if entry is not None:
+        entry.clear()
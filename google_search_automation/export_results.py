@@ -0,0 +1,233 @@
+from pyarrow import csv as pa_csv
+from datetime import datetime
+from db_pool import postgres_connection, oracle_connection, close_pools, clob_as_string
+from result_recorder import POSTGRES, ORACLE
+from analytics import ingestion_cutoff
+import pyarrow.parquet as pq
+import pyarrow as pa
+import threading
+import argparse
+import logging
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exports')
+STATE_FILE = 'export_state.json'
+
+# Both backends are exported with the same columns; Oracle's test_time and PostgreSQL's timestamp become test_time.
+SCHEMA = pa.schema([
+    ('test_name', pa.string()),
+    ('status', pa.string()),
+    ('details', pa.string()),
+    ('test_time', pa.timestamp('us')),
+])
+
+
+def iter_batches_postgres(since, until, batch_size, after_time=None):
+    """
+    Input:
+        - since: Only export rows ingested after this time (datetime), or None for all rows
+        - until: Only export rows ingested up to this time (datetime)
+        - batch_size: Approximate number of rows per record batch (int)
+        - after_time: Only export rows whose test time is newer than this (datetime), or None
+    Output: Generator of pyarrow RecordBatches with SCHEMA
+    Description: Streams test_results with COPY ... TO STDOUT through a pipe into pyarrow's streaming CSV reader,
+    so rows are never turned into Python tuples and memory stays bounded by one block.
+    """
+    read_fd, write_fd = os.pipe()
+    errors = []
+    with postgres_connection() as connection:
+        cursor = connection.cursor()
+        conditions, params = ["ingested_at <= %s"], [until]
+        if since is not None:
+            conditions.append("ingested_at > %s")
+            params.append(since)
+        if after_time is not None:
+            conditions.append("timestamp > %s")
+            params.append(after_time)
+        where = cursor.mogrify("WHERE " + " AND ".join(conditions), params).decode()
+        copy_query = f"""
+            COPY (
+                SELECT test_name, status, details, timestamp AS test_time
+                FROM test_results
+                {where}
+                ORDER BY timestamp
+            ) TO STDOUT WITH (FORMAT csv)
+        """
+
+        def copy_out():
+            try:
+                with os.fdopen(write_fd, 'wb') as pipe:
+                    cursor.copy_expert(copy_query, pipe)
+            except Exception as e:
+                errors.append(e)
+
+        writer = threading.Thread(target=copy_out, name='postgres-copy-out', daemon=True)
+        writer.start()
+        try:
+            with os.fdopen(read_fd, 'rb') as pipe:
+                reader = pa_csv.open_csv(
+                    pipe,
+                    # Rows average well under 256 bytes, so this block size yields roughly batch_size rows per batch.
+                    read_options=pa_csv.ReadOptions(column_names=SCHEMA.names, block_size=max(batch_size * 256, 1 << 20)),
+                    parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                    # COPY writes NULL as an empty field and an empty string as "".
+                    convert_options=pa_csv.ConvertOptions(column_types=SCHEMA, strings_can_be_null=True, quoted_strings_can_be_null=False)
+                )
+                for batch in reader:
+                    yield batch
+        finally:
+            writer.join()
+            cursor.close()
+            connection.rollback()
+    if errors:
+        raise errors[0]
+
+
+def iter_batches_oracle(since, until, batch_size, after_time=None):
+    """
+    Input:
+        - since: Only export rows ingested after this time (datetime), or None for all rows
+        - until: Only export rows ingested up to this time (datetime)
+        - batch_size: Number of rows per array fetch and record batch (int)
+        - after_time: Only export rows whose test time is newer than this (datetime), or None
+    Output: Generator of pyarrow RecordBatches with SCHEMA
+    Description: Streams test_results with array fetches of batch_size rows and turns every fetch into one record batch.
+    """
+    conditions, params = ["ingested_at <= :until"], {'until': until}
+    if since is not None:
+        conditions.append("ingested_at > :since")
+        params['since'] = since
+    if after_time is not None:
+        conditions.append("test_time > :after_time")
+        params['after_time'] = after_time
+    with oracle_connection() as connection:
+        cursor = connection.cursor()
+        cursor.arraysize = batch_size
+        cursor.prefetchrows = batch_size + 1
+        cursor.outputtypehandler = clob_as_string
+        try:
+            cursor.execute(f"""
+                SELECT test_name, status, details, test_time
+                FROM test_results
+                WHERE {' AND '.join(conditions)}
+                ORDER BY test_time
+            """, params)
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    return
+                columns = list(zip(*rows))
+                yield pa.RecordBatch.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, SCHEMA)],
+                    schema=SCHEMA
+                )
+        finally:
+            cursor.close()
+
+
+BATCH_READERS = {
+    POSTGRES: iter_batches_postgres,
+    ORACLE: iter_batches_oracle,
+}
+
+
+def load_state(export_dir):
+    """
+    Input: export_dir (str) - Directory holding the exports and their state file
+    Output: (dict) - Backend name to {'ingested_until': datetime} for exports tracked by ingestion time, or to
+    {'after_time': datetime} for state written by older versions, which tracked the newest exported test time
+    Description: Reads where the previous export of each backend stopped.
+    """
+    path = os.path.join(export_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        saved = json.load(f)
+    state = {}
+    for backend, value in saved.items():
+        if isinstance(value, str):
+            state[backend] = {'after_time': datetime.fromisoformat(value)}
+        else:
+            state[backend] = {'ingested_until': datetime.fromisoformat(value['ingested_until'])}
+    return state
+
+
+def save_state(export_dir, state):
+    """
+    Input:
+        - export_dir: Directory holding the exports and their state file (str)
+        - state: Backend name to {'ingested_until': datetime} (dict)
+    Output: None
+    Description: Atomically replaces the state file, so an interrupted export never leaves it half-written.
+    """
+    path = os.path.join(export_dir, STATE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({backend: {key: value.isoformat() for key, value in position.items()} for backend, position in state.items()}, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def export_results(backend, export_dir=DEFAULT_EXPORT_DIR, full=False, batch_size=50000):
+    """
+    Input:
+        - backend: POSTGRES or ORACLE (str)
+        - export_dir: Directory the Parquet files and the state file are written to (str)
+        - full: Export the whole table instead of only the rows that arrived since the previous export (bool)
+        - batch_size: Number of rows per record batch (int)
+    Output: (str) - Path of the written Parquet file, or None when there was nothing new to export
+    Description: Writes the test results of one backend to a new zstd-compressed Parquet file, one record batch at a time.
+    Rows are selected by ingestion time, so rows that reach the database late with an older test time (spool replay,
+    SQLite sync) are exported by the next run. The state file only moves forward after the file is complete, so a failed
+    export is simply repeated by the next run. Rows that arrived less than ANALYTICS_SETTLE_SECONDS ago are left for the next export.
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    state = load_state(export_dir)
+    position = {} if full else state.get(backend, {})
+    until = ingestion_cutoff(backend)
+
+    name = f"test_results_{backend.lower()}_{until:%Y%m%dT%H%M%S}{'_full' if full else ''}.parquet"
+    path = os.path.join(export_dir, name)
+    rows = 0
+    writer = None
+    try:
+        for batch in BATCH_READERS[backend](position.get('ingested_until'), until, batch_size, position.get('after_time')):
+            if batch.num_rows == 0:
+                continue
+            if writer is None:
+                writer = pq.ParquetWriter(path + '.tmp', SCHEMA, compression='zstd')
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    except Exception:
+        if writer is not None:
+            writer.close()
+            os.remove(path + '.tmp')
+        raise
+    if writer is not None:
+        writer.close()
+        os.replace(path + '.tmp', path)
+
+    previous = state.get(backend, {}).get('ingested_until')
+    state[backend] = {'ingested_until': max(until, previous) if previous else until}
+    save_state(export_dir, state)
+    if writer is None:
+        logger.info(f"No new test results to export from {backend}")
+        return None
+    logger.info(f"Exported {rows} test results from {backend} to {path}")
+    return path
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Export test results to compressed Parquet files for the analytics stack.")
+    parser.add_argument('--backend', choices=['postgres', 'oracle', 'both'], default='postgres')
+    parser.add_argument('--out', default=DEFAULT_EXPORT_DIR, help="Directory for the Parquet files and the export state")
+    parser.add_argument('--full', action='store_true', help="Export every row instead of only the rows since the last export")
+    parser.add_argument('--batch-size', type=int, default=50000, help="Rows per record batch")
+    args = parser.parse_args()
+
+    backends = {'postgres': (POSTGRES,), 'oracle': (ORACLE,), 'both': (POSTGRES, ORACLE)}[args.backend]
+    for backend in backends:
+        export_results(backend, args.out, args.full, args.batch_size)
+    close_pools()
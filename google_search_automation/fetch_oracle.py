@@ -1,73 +1,176 @@
-import cx_Oracle
-import os
-
-# Oracle connection details
-oracle_config = {
-    'dsn': cx_Oracle.makedsn(
-        os.getenv('ORACLE_HOST', 'localhost'),
-        int(os.getenv('ORACLE_PORT', '1521')),
-        service_name=os.getenv('ORACLE_DBNAME', 'xe')
-    ),
-    'user': os.getenv('ORACLE_USER', 'system'),
-    'password': os.getenv('ORACLE_PASSWORD', 'Roni2108')
-}
+from datetime import datetime
+from db_pool import oracle_connection, close_pools, clob_as_string
+import argparse
 
 def fetch_last_10_tests_oracle():
     try:
-        connection = cx_Oracle.connect(
-            user=oracle_config['user'],
-            password=oracle_config['password'],
-            dsn=oracle_config['dsn']
-        )
-        cursor = connection.cursor()
-        query = """
-            SELECT test_name, status, details, test_time
-            FROM (
+        with oracle_connection() as connection:
+            cursor = connection.cursor()
+            query = """
                 SELECT test_name, status, details, test_time
-                FROM test_results
-                ORDER BY test_time DESC
-            )
-            WHERE ROWNUM <= 10
-            ORDER BY test_time ASC;
-        """
-        cursor.execute(query)
-        results = cursor.fetchall()
+                FROM (
+                    SELECT test_name, status, details, test_time
+                    FROM test_results
+                    ORDER BY test_time DESC
+                )
+                WHERE ROWNUM <= 10
+                ORDER BY test_time ASC
+            """
+            cursor.execute(query)
+            results = cursor.fetchall()
 
-        print("Last 10 test results from Oracle:")
-        for row in results:
-            print(f"Test Name: {row[0]}, Status: {row[1]}, Details: {row[2]}, Test Time: {row[3]}")
+            print("Last 10 test results from Oracle:")
+            for row in results:
+                print(f"Test Name: {row[0]}, Status: {row[1]}, Details: {row[2]}, Test Time: {row[3]}")
 
-        cursor.close()
-        connection.close()
+            cursor.close()
     except Exception as e:
         print(f"Failed to fetch results from Oracle: {str(e)}")
 
-def fetch_all_tests_oracle():
-    try:
-        connection = cx_Oracle.connect(
-            user=oracle_config['user'],
-            password=oracle_config['password'],
-            dsn=oracle_config['dsn']
-        )
+def iter_tests_oracle(since=None, arraysize=2000):
+    """
+    Input:
+        - since: Only return rows newer than this timestamp (datetime), or None for all rows
+        - arraysize: Number of rows fetched from the server per round trip (int)
+    Output: Generator of (test_name, status, details, test_time) tuples, oldest first
+    Description: Streams test_results in arraysize batches, so memory stays bounded no matter how large the table is.
+    """
+    with oracle_connection() as connection:
         cursor = connection.cursor()
-        query = """
-            SELECT test_name, status, details, test_time
-            FROM test_results
-            ORDER BY test_time;
-        """
-        cursor.execute(query)
-        results = cursor.fetchall()
+        # Rows are pulled arraysize at a time; prefetchrows lets the first batch arrive with the execute call.
+        cursor.arraysize = arraysize
+        cursor.prefetchrows = arraysize + 1
+        cursor.outputtypehandler = clob_as_string
+        try:
+            if since is None:
+                cursor.execute("""
+                    SELECT test_name, status, details, test_time
+                    FROM test_results
+                    ORDER BY test_time
+                """)
+            else:
+                cursor.execute("""
+                    SELECT test_name, status, details, test_time
+                    FROM test_results
+                    WHERE test_time > :since
+                    ORDER BY test_time
+                """, since=since)
+            for row in cursor:
+                yield row
+        finally:
+            cursor.close()
 
+def fetch_page_oracle(after=None, limit=1000):
+    """
+    Input:
+        - after: (test_time, test_name) of the last row of the previous page, or None for the first page
+        - limit: Maximum number of rows in the page (int)
+    Output: (list) - Up to limit (test_name, status, details, test_time) tuples, oldest first
+    Description: Returns one page of test_results using keyset pagination on (test_time, test_name), which stays fast on deep pages unlike OFFSET.
+    """
+    with oracle_connection() as connection:
+        cursor = connection.cursor()
+        cursor.arraysize = limit
+        cursor.prefetchrows = limit + 1
+        # The page is returned after the session goes back to the pool, so details must not come back as LOB locators.
+        cursor.outputtypehandler = clob_as_string
+        if after is None:
+            cursor.execute("""
+                SELECT test_name, status, details, test_time
+                FROM (
+                    SELECT test_name, status, details, test_time
+                    FROM test_results
+                    ORDER BY test_time, test_name
+                )
+                WHERE ROWNUM <= :limit
+            """, limit=limit)
+        else:
+            import cx_Oracle
+            # Bound as DATE by default, the cursor time would lose its fractional seconds and repeat or skip rows.
+            cursor.setinputsizes(after_time=cx_Oracle.DB_TYPE_TIMESTAMP)
+            cursor.execute("""
+                SELECT test_name, status, details, test_time
+                FROM (
+                    SELECT test_name, status, details, test_time
+                    FROM test_results
+                    WHERE test_time > :after_time
+                       OR (test_time = :after_time AND test_name > :after_name)
+                    ORDER BY test_time, test_name
+                )
+                WHERE ROWNUM <= :limit
+            """, after_time=after[0], after_name=after[1], limit=limit)
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+def iter_pages_oracle(page_size=1000, after=None):
+    """
+    Input:
+        - page_size: Number of rows per page (int)
+        - after: (test_time, test_name) to resume after, or None to start from the oldest row
+    Output: Generator of pages (lists of rows)
+    Description: Walks the whole table page by page with fetch_page_oracle. Each page is a separate short query, so a pooled session is only held while a page is fetched.
+    """
+    while True:
+        rows = fetch_page_oracle(after, page_size)
+        if not rows:
+            return
+        yield rows
+        after = (rows[-1][3], rows[-1][0])
+
+def fetch_all_tests_oracle(since=None):
+    try:
         print("All test results from Oracle:")
-        for row in results:
+        for row in iter_tests_oracle(since):
             print(f"Test Name: {row[0]}, Status: {row[1]}, Details: {row[2]}, Test Time: {row[3]}")
+    except Exception as e:
+        print(f"Failed to fetch results from Oracle: {str(e)}")
 
+def fetch_step_percentiles_oracle(since=None):
+    """
+    Input: since - Only use timings newer than this timestamp (datetime), or None for all of them
+    Output: (list) - (step, count, p50_ms, p95_ms) tuples ordered by step
+    Description: Computes the median and 95th percentile duration of every timed step inside the database.
+    """
+    with oracle_connection() as connection:
+        cursor = connection.cursor()
+        query = """
+            SELECT step, COUNT(*),
+                   PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY duration_ms),
+                   PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY duration_ms)
+            FROM test_step_timings
+            {where}
+            GROUP BY step
+            ORDER BY step
+        """
+        if since is None:
+            cursor.execute(query.format(where=""))
+        else:
+            cursor.execute(query.format(where="WHERE test_time > :since"), since=since)
+        rows = cursor.fetchall()
         cursor.close()
-        connection.close()
+    return rows
+
+def print_step_percentiles_oracle(since=None):
+    try:
+        rows = fetch_step_percentiles_oracle(since)
+        print("Step durations from Oracle:")
+        for step, count, p50, p95 in rows:
+            print(f"Step: {step}, Count: {count}, p50: {p50:.0f} ms, p95: {p95:.0f} ms")
     except Exception as e:
-        print(f"Failed to fetch results from Oracle: {str(e)}")
+        print(f"Failed to fetch step durations from Oracle: {str(e)}")
 
 if __name__ == "__main__":
-    fetch_last_10_tests_oracle()
-    # Uncomment the following line to fetch and print all tests
-    # fetch_all_tests_oracle()
+    parser = argparse.ArgumentParser(description="Print test results stored in Oracle.")
+    parser.add_argument('--all', action='store_true', help="Stream every test result instead of the last 10")
+    parser.add_argument('--percentiles', action='store_true', help="Print p50/p95 duration per timed step instead of test results")
+    parser.add_argument('--since', type=datetime.fromisoformat, help="With --all or --percentiles, only rows newer than this ISO timestamp")
+    args = parser.parse_args()
+
+    if args.percentiles:
+        print_step_percentiles_oracle(args.since)
+    elif args.all:
+        fetch_all_tests_oracle(args.since)
+    else:
+        fetch_last_10_tests_oracle()
+    close_pools()
@@ -1,62 +1,161 @@
-import psycopg2
-import os
-
-# PostgreSQL connection details
-postgres_config = {
-    'dbname': os.getenv('POSTGRES_DBNAME', 'postgres'),
-    'user': os.getenv('POSTGRES_USER', 'postgres'),
-    'password': os.getenv('POSTGRES_PASSWORD', 'Roni2108'),
-    'host': os.getenv('POSTGRES_HOST', 'localhost'),
-    'port': int(os.getenv('POSTGRES_PORT', '5432'))
-}
+from datetime import datetime
+from db_pool import postgres_connection, close_pools
+import argparse
 
 def fetch_last_10_tests_postgres():
     try:
-        connection = psycopg2.connect(**postgres_config)
+        with postgres_connection() as connection:
+            cursor = connection.cursor()
+            query = """
+                SELECT test_name, status, details, timestamp
+                FROM test_results
+                ORDER BY timestamp DESC
+                LIMIT 10;
+            """
+            cursor.execute(query)
+            results = cursor.fetchall()
+
+            # Reverse the results to print from oldest to newest
+            results.reverse()
+
+            print("Last 10 test results from PostgreSQL:")
+            for row in results:
+                print(f"Test Name: {row[0]}, Status: {row[1]}, Details: {row[2]}, Test Time: {row[3]}")
+
+            cursor.close()
+    except Exception as e:
+        print(f"Failed to fetch results from PostgreSQL: {str(e)}")
+
+def iter_tests_postgres(since=None, itersize=2000):
+    """
+    Input:
+        - since: Only return rows newer than this timestamp (datetime), or None for all rows
+        - itersize: Number of rows fetched from the server per round trip (int)
+    Output: Generator of (test_name, status, details, timestamp) tuples, oldest first
+    Description: Streams test_results through a named server-side cursor, so memory stays bounded by itersize no matter how large the table is.
+    """
+    with postgres_connection() as connection:
+        # A named cursor keeps the result set on the server and pulls it in itersize chunks.
+        cursor = connection.cursor(name='test_results_stream')
+        cursor.itersize = itersize
+        try:
+            if since is None:
+                cursor.execute("""
+                    SELECT test_name, status, details, timestamp
+                    FROM test_results
+                    ORDER BY timestamp
+                """)
+            else:
+                cursor.execute("""
+                    SELECT test_name, status, details, timestamp
+                    FROM test_results
+                    WHERE timestamp > %s
+                    ORDER BY timestamp
+                """, (since,))
+            for row in cursor:
+                yield row
+        finally:
+            cursor.close()
+            connection.rollback() # End the read-only transaction the named cursor lived in
+
+def fetch_page_postgres(after=None, limit=1000):
+    """
+    Input:
+        - after: (timestamp, test_name) of the last row of the previous page, or None for the first page
+        - limit: Maximum number of rows in the page (int)
+    Output: (list) - Up to limit (test_name, status, details, timestamp) tuples, oldest first
+    Description: Returns one page of test_results using keyset pagination on (timestamp, test_name), which stays fast on deep pages unlike OFFSET.
+    """
+    with postgres_connection() as connection:
         cursor = connection.cursor()
-        query = """
-            SELECT test_name, status, details, timestamp
-            FROM test_results
-            ORDER BY timestamp DESC
-            LIMIT 10;
-        """
-        cursor.execute(query)
-        results = cursor.fetchall()
+        if after is None:
+            cursor.execute("""
+                SELECT test_name, status, details, timestamp
+                FROM test_results
+                ORDER BY timestamp, test_name
+                LIMIT %s
+            """, (limit,))
+        else:
+            cursor.execute("""
+                SELECT test_name, status, details, timestamp
+                FROM test_results
+                WHERE (timestamp, test_name) > (%s, %s)
+                ORDER BY timestamp, test_name
+                LIMIT %s
+            """, (after[0], after[1], limit))
+        rows = cursor.fetchall()
+        cursor.close()
+        connection.rollback()
+    return rows
 
-        # Reverse the results to print from oldest to newest
-        results.reverse()
+def iter_pages_postgres(page_size=1000, after=None):
+    """
+    Input:
+        - page_size: Number of rows per page (int)
+        - after: (timestamp, test_name) to resume after, or None to start from the oldest row
+    Output: Generator of pages (lists of rows)
+    Description: Walks the whole table page by page with fetch_page_postgres. Each page is a separate short query, so a pooled connection is only held while a page is fetched.
+    """
+    while True:
+        rows = fetch_page_postgres(after, page_size)
+        if not rows:
+            return
+        yield rows
+        after = (rows[-1][3], rows[-1][0])
 
-        print("Last 10 test results from PostgreSQL:")
-        for row in results:
+def fetch_all_tests_postgres(since=None):
+    try:
+        print("All test results from PostgreSQL:")
+        for row in iter_tests_postgres(since):
             print(f"Test Name: {row[0]}, Status: {row[1]}, Details: {row[2]}, Test Time: {row[3]}")
-        
-        cursor.close()
-        connection.close()
     except Exception as e:
         print(f"Failed to fetch results from PostgreSQL: {str(e)}")
 
-def fetch_all_tests_postgres():
-    try:
-        connection = psycopg2.connect(**postgres_config)
+def fetch_step_percentiles_postgres(since=None):
+    """
+    Input: since - Only use timings newer than this timestamp (datetime), or None for all of them
+    Output: (list) - (step, count, p50_ms, p95_ms) tuples ordered by step
+    Description: Computes the median and 95th percentile duration of every timed step inside the database.
+    """
+    with postgres_connection() as connection:
         cursor = connection.cursor()
         query = """
-            SELECT test_name, status, details, timestamp
-            FROM test_results
-            ORDER BY timestamp;
+            SELECT step, COUNT(*),
+                   PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY duration_ms),
+                   PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY duration_ms)
+            FROM test_step_timings
+            {where}
+            GROUP BY step
+            ORDER BY step
         """
-        cursor.execute(query)
-        results = cursor.fetchall()
-
-        print("All test results from PostgreSQL:")
-        for row in results:
-            print(f"Test Name: {row[0]}, Status: {row[1]}, Details: {row[2]}, Test Time: {row[3]}")
-        
+        if since is None:
+            cursor.execute(query.format(where=""))
+        else:
+            cursor.execute(query.format(where="WHERE timestamp > %s"), (since,))
+        rows = cursor.fetchall()
         cursor.close()
-        connection.close()
+    return rows
+
+def print_step_percentiles_postgres(since=None):
+    try:
+        rows = fetch_step_percentiles_postgres(since)
+        print("Step durations from PostgreSQL:")
+        for step, count, p50, p95 in rows:
+            print(f"Step: {step}, Count: {count}, p50: {p50:.0f} ms, p95: {p95:.0f} ms")
     except Exception as e:
-        print(f"Failed to fetch results from PostgreSQL: {str(e)}")
+        print(f"Failed to fetch step durations from PostgreSQL: {str(e)}")
 
 if __name__ == "__main__":
-    fetch_last_10_tests_postgres()
-    # Uncomment the following line to fetch and print all tests
-    # fetch_all_tests_postgres()
+    parser = argparse.ArgumentParser(description="Print test results stored in PostgreSQL.")
+    parser.add_argument('--all', action='store_true', help="Stream every test result instead of the last 10")
+    parser.add_argument('--percentiles', action='store_true', help="Print p50/p95 duration per timed step instead of test results")
+    parser.add_argument('--since', type=datetime.fromisoformat, help="With --all or --percentiles, only rows newer than this ISO timestamp")
+    args = parser.parse_args()
+
+    if args.percentiles:
+        print_step_percentiles_postgres(args.since)
+    elif args.all:
+        fetch_all_tests_postgres(args.since)
+    else:
+        fetch_last_10_tests_postgres()
+    close_pools()
@@ -0,0 +1,175 @@
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from timing import span
+import requests
+import threading
+import logging
+import time
+import io
+import os
+
+logger = logging.getLogger(__name__)
+
+# Same browser identity as the Playwright context, so landing pages answer the API checks like they answer the browser.
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+def build_session(pool_size=10, retries=3, backoff_factor=0.5):
+    """
+    Input:
+        - pool_size: Keep-alive connections kept per host (int)
+        - retries: Retries for connection errors and 429/5xx responses (int)
+        - backoff_factor: Base of the exponential backoff between retries, in seconds (float)
+    Output: requests.Session
+    Description: Builds a session with pooled keep-alive connections and retry-with-backoff on transient failures.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False # Hand the last response back so the tests can assert on its status code
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = DEFAULT_USER_AGENT
+    return session
+
+
+class _RecordingRaw:
+    """
+    Wraps the urllib3 response behind a requests.Response and keeps the body once it has been read to the end,
+    so the cache knows whether the body can be served again without looking at the private state of requests.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.started = False # Part of the body has been read, so the response cannot be handed out again as is
+        self.body = None     # Whole decoded body, once the stream was read to the end
+
+    def stream(self, amt=None, decode_content=None):
+        """
+        Input: amt, decode_content - See urllib3.response.HTTPResponse.stream
+        Output: (generator) - Body chunks, as read by Response.iter_content and Response.content
+        Description: Streams the body and records it when the stream is exhausted.
+        """
+        self.started = True
+        chunks = []
+        for chunk in self._raw.stream(amt, decode_content=decode_content):
+            chunks.append(chunk)
+            yield chunk
+        self.body = b''.join(chunks)
+
+    def read(self, *args, **kwargs):
+        self.started = True
+        return self._raw.read(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+def _replay(response, body):
+    """
+    Input:
+        - response: requests.Response whose body was read to the end
+        - body: The recorded body (bytes)
+    Output: requests.Response
+    Description: Builds a fresh response with the same status, headers and body, which can be read like a new one.
+    """
+    replay = requests.Response()
+    for name in ('status_code', 'headers', 'url', 'encoding', 'reason', 'history', 'cookies', 'elapsed', 'request'):
+        setattr(replay, name, getattr(response, name))
+    replay.raw = io.BytesIO(body)
+    return replay
+
+
+def _reusable(response):
+    """
+    Input: response (requests.Response) - Cached response
+    Output: requests.Response or None - Response to hand out for a cache hit, or None if the URL must be fetched again
+    Description: A recorded body is replayed; a streamed response is reused only while its body is still unread.
+    A streamed body that was abandoned part-way cannot be served again.
+    """
+    raw = response.raw
+    if raw.body is not None:
+        return _replay(response, raw.body)
+    if not raw.started and not raw.closed:
+        return response
+    return None
+
+
+class HttpClient:
+    """
+    Shared HTTP client for the checks that call the sponsored landing page.
+    Responses are cached by URL, so a page that several checks need is only downloaded once.
+    With stream=True only the headers are read up front; a body read to the end is kept and replayed
+    to later callers, while a caller that abandons a streamed body part-way (see content_scan.scan_response)
+    leaves an entry that is fetched again on the next call.
+    """
+
+    def __init__(self, session=None, timeout=(5, 15)):
+        self.session = session or build_session()
+        self.timeout = timeout
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url, stream=False):
+        """
+        Input:
+            - url: URL to fetch (str)
+            - stream: Return before the body is downloaded (bool)
+        Output: requests.Response
+        Description: Returns the cached response for url, fetching it on the first call. Logs cache hits and misses and the fetch latency.
+        """
+        with self._lock:
+            cached = self._cache.get(url)
+            response = _reusable(cached) if cached is not None else None
+            if response is not None:
+                self.hits += 1
+                logger.info(f"HTTP cache hit for {url}")
+            else:
+                self.misses += 1
+        if response is None:
+            started = time.perf_counter()
+            with span('http_get'):
+                # Always streamed, so the body is read through the recorder even when the caller wants it whole.
+                response = self.session.get(url, timeout=self.timeout, stream=True)
+                response.raw = _RecordingRaw(response.raw)
+                if not stream:
+                    response.content
+            logger.info(f"HTTP cache miss for {url}, fetched in {(time.perf_counter() - started) * 1000:.0f} ms (status {response.status_code})")
+            with self._lock:
+                self._cache[url] = response
+        if not stream:
+            response.content # Finish the download of a response that was cached while streaming
+        return response
+
+    def close(self):
+        """
+        Input: None
+        Output: None
+        Description: Logs the cache statistics and closes the pooled connections.
+        """
+        logger.info(f"HTTP cache: {self.hits} hit(s), {self.misses} miss(es)")
+        for response in self._cache.values():
+            response.close()
+        self._cache.clear()
+        self.session.close()
+
+
+def client_from_env():
+    """
+    Input: None
+    Output: HttpClient instance
+    Description: Creates an HttpClient configured from HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_RETRIES and HTTP_POOL_SIZE.
+    """
+    session = build_session(
+        pool_size=int(os.getenv('HTTP_POOL_SIZE', '10')),
+        retries=int(os.getenv('HTTP_RETRIES', '3'))
+    )
+    timeout = (float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')), float(os.getenv('HTTP_READ_TIMEOUT', '15')))
+    return HttpClient(session, timeout)
@@ -0,0 +1,147 @@
+from http_client import DEFAULT_USER_AGENT
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from urllib.parse import urlsplit
+import argparse
+import asyncio
+import aiohttp
+import logging
+import json
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying; anything else is a final answer.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class LinkChecker:
+    """
+    Checks many links concurrently with one aiohttp session.
+    Each link is requested with HEAD and, when the server refuses HEAD or answers it with an error, with GET
+    (the body is never downloaded). Redirects are followed and recorded, connection errors, timeouts and
+    429/5xx answers are retried with backoff, and a semaphore per host keeps a single site from being hammered
+    while links to different hosts are checked in parallel.
+    per_host is a trade-off: links beyond it on one host are checked in waves, so a batch only takes as long as its
+    slowest link when no host has more than per_host links. Search results concentrate on a few hosts (every video
+    is on www.youtube.com), hence the generous default; lower it when a host starts answering 429.
+    """
+
+    def __init__(self, per_host=16, timeout=10.0, retries=2, backoff_factor=0.5, max_redirects=10):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_redirects = max_redirects
+        self._host_limits = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+
+    async def _request(self, session, method, url):
+        """
+        Input:
+            - session: aiohttp ClientSession
+            - method: 'HEAD' or 'GET' (str)
+            - url: Link to request (str)
+        Output: (tuple) - (status, final URL, redirect chain)
+        Description: Sends one request, following redirects, and returns as soon as the headers of the last response arrive.
+        """
+        async with self._host_limits[urlsplit(url).hostname], session.request(
+            method, url, allow_redirects=True, max_redirects=self.max_redirects
+        ) as response:
+            redirects = [str(hop.url) for hop in response.history]
+            return response.status, str(response.url), redirects
+
+    async def check(self, session, url):
+        """
+        Input:
+            - session: aiohttp ClientSession
+            - url: Link to check (str)
+        Output: (dict) - url, ok, status, final_url, redirects, method, latency_ms, attempts and error
+        Description: Checks one link, retrying transient failures. latency_ms covers the last attempt only.
+        """
+        result = {'url': url, 'ok': False, 'status': None, 'final_url': None, 'redirects': [],
+                  'method': None, 'latency_ms': None, 'attempts': 0, 'error': None}
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff_factor * 2 ** (attempt - 1))
+            result['attempts'] = attempt + 1
+            started = time.perf_counter()
+            try:
+                method = 'HEAD'
+                status, final_url, redirects = await self._request(session, method, url)
+                if status >= 400:
+                    # Plenty of servers answer HEAD with 403/404/405 while GET works.
+                    method = 'GET'
+                    status, final_url, redirects = await self._request(session, method, url)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                result.update(error=f"{type(e).__name__}: {str(e)}", latency_ms=(time.perf_counter() - started) * 1000)
+                continue
+            result.update(status=status, final_url=final_url, redirects=redirects, method=method, error=None,
+                          ok=status < 400, latency_ms=(time.perf_counter() - started) * 1000)
+            if status not in RETRY_STATUSES:
+                break
+        return result
+
+    async def check_all(self, urls):
+        """
+        Input: urls (iterable) - Links to check; duplicates are checked once
+        Output: (list) - One result dict per distinct link, in input order
+        Description: Checks every link at the same time, so the whole batch takes about as long as the slowest link.
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        self._host_limits.clear() # Semaphores belong to the event loop they were first used in
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        # The connector limit is a safety net; the per-host semaphores do the actual throttling.
+        connector = aiohttp.TCPConnector(limit=max(len(urls), 1) * 2, ttl_dns_cache=300)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector, headers={'User-Agent': DEFAULT_USER_AGENT}) as session:
+            return await asyncio.gather(*(self.check(session, url) for url in urls))
+
+
+def checker_from_env():
+    """
+    Input: None
+    Output: LinkChecker instance
+    Description: Builds a checker configured by LINK_CHECK_PER_HOST, LINK_CHECK_TIMEOUT (seconds per request) and LINK_CHECK_RETRIES.
+    """
+    return LinkChecker(
+        per_host=int(os.getenv('LINK_CHECK_PER_HOST', '16')),
+        timeout=float(os.getenv('LINK_CHECK_TIMEOUT', '10')),
+        retries=int(os.getenv('LINK_CHECK_RETRIES', '2'))
+    )
+
+
+def check_links(urls, checker=None):
+    """
+    Input:
+        - urls: Links to check (iterable)
+        - checker: LinkChecker to use, defaults to checker_from_env()
+    Output: (list) - One result dict per distinct link
+    Description: Synchronous entry point for the tests; runs the concurrent check in its own event loop and logs every result.
+    """
+    checker = checker or checker_from_env()
+    # A thread of its own keeps the event loop away from the one Playwright's sync API drives on the calling thread.
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="link-check") as executor:
+        results = executor.submit(asyncio.run, checker.check_all(urls)).result()
+    for result in results:
+        if result['ok']:
+            logger.info(f"Link {result['url']}: {result['status']} via {result['method']} in {result['latency_ms']:.0f} ms -> {result['final_url']}")
+        else:
+            logger.warning(f"Link {result['url']} is broken: {result['error'] or result['status']} after {result['attempts']} attempt(s)")
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Check that links answer, following redirects, and print the results as JSON.")
+    parser.add_argument('urls', nargs='*', help="Links to check")
+    parser.add_argument('--run-id', help="Check the sponsored and video links an earlier test run stored in the artifact store")
+    args = parser.parse_args()
+
+    urls = list(args.urls)
+    if args.run_id:
+        from artifact_store import ArtifactStore
+        from search_page import SEARCH_QUERY
+        store = ArtifactStore(args.run_id)
+        urls += store.get(SEARCH_QUERY, 'sponsored_links', []) + store.get(SEARCH_QUERY, 'youtube_video_links', [])
+        store.close()
+    print(json.dumps(check_links(urls), indent=2))
@@ -0,0 +1,82 @@
+from urllib.parse import urlparse
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+LIVE = 'live'      # Talk to the real google.com
+RECORD = 'record'  # Talk to the real google.com and save every response to a HAR file
+REPLAY = 'replay'  # Serve recorded responses only, no network access
+NETWORK_MODES = (LIVE, RECORD, REPLAY)
+
+SNAPSHOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Snapshot served for each Google path when replaying without a HAR file.
+SNAPSHOT_PAGES = {
+    '/': 'page_content.html',
+    '/webhp': 'page_content.html',
+    '/search': 'videos_tab_page.html',
+}
+
+# Without Google's scripts the search box no longer submits on Enter, so the snapshot home page gets a plain form submit instead.
+SUBMIT_ON_ENTER_SCRIPT = """
+document.addEventListener('keydown', (event) => {
+    const box = event.target;
+    if (event.key === 'Enter' && box.matches && box.matches('textarea[name="q"], input[name="q"]') && box.form) {
+        event.preventDefault();
+        box.form.submit();
+    }
+}, true);
+"""
+
+
+def snapshot_for_url(url):
+    """
+    Input: url (str) - URL of a document request
+    Output: (str or None) - Path of the snapshot that answers the request, or None if there is none
+    Description: Maps a google.com page URL to one of the checked-in HTML snapshots.
+    """
+    parsed = urlparse(url)
+    if not parsed.hostname or not parsed.hostname.endswith('google.com'):
+        return None
+    snapshot = SNAPSHOT_PAGES.get(parsed.path.rstrip('/') or '/')
+    return os.path.join(SNAPSHOT_DIR, snapshot) if snapshot else None
+
+
+def _serve_snapshot(route):
+    """
+    Input: route (Playwright Route)
+    Output: None
+    Description: Fulfils Google page requests from the snapshot files and aborts everything else, so replay never touches the network.
+    """
+    request = route.request
+    snapshot = snapshot_for_url(request.url) if request.resource_type == 'document' else None
+    if snapshot is None:
+        route.abort()
+        return
+    route.fulfill(path=snapshot, status=200, content_type='text/html; charset=utf-8')
+
+
+def install_network_mode(context, mode, har_path):
+    """
+    Input:
+        - context: Playwright BrowserContext
+        - mode: One of 'live', 'record' or 'replay' (str)
+        - har_path: HAR file written in record mode and read in replay mode (str)
+    Output: None
+    Description: Wires the browser context for the selected network mode. Record mode saves every response to har_path when the context closes.
+    Replay mode serves responses from har_path if it exists, otherwise from the checked-in HTML snapshots, and aborts any request it has no answer for.
+    """
+    if mode not in NETWORK_MODES:
+        raise ValueError(f"Unsupported network mode '{mode}'. Use one of {', '.join(NETWORK_MODES)}.")
+
+    if mode == RECORD:
+        logger.info(f"Recording network traffic to {har_path}")
+        context.route_from_har(har_path, update=True, update_content='embed')
+    elif mode == REPLAY and os.path.exists(har_path):
+        logger.info(f"Replaying network traffic from {har_path}")
+        context.route_from_har(har_path, not_found='abort')
+    elif mode == REPLAY:
+        logger.info(f"No HAR file at {har_path}, replaying from the HTML snapshots")
+        context.add_init_script(SUBMIT_ON_ENTER_SCRIPT)
+        context.route("**/*", _serve_snapshot)
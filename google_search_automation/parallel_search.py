@@ -0,0 +1,238 @@
+from playwright.async_api import async_playwright
+from urllib.parse import urlencode
+from dom_extract import EXTRACTORS, SPONSORED, VIDEOS
+from relevance import RelevanceScorer
+from resource_filter import ResourceFilter
+from result_recorder import close_recorder, get_recorder
+from db_pool import close_pools
+from search_page import (
+    RESULTS_SELECTOR, LOCATION_PROMPT_SELECTOR, LOCALE, USER_AGENT,
+    MIN_YOUTUBE_RESULTS, RELEVANT_VIDEOS_CHECKED, VIDEO_RELEVANCE_ALIASES
+)
+import argparse
+import asyncio
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def search_url(query, videos=False):
+    """
+    Input:
+        - query: Search term (str)
+        - videos: Open the 'Videos' tab instead of all results (bool)
+    Output: (str) - Google search URL in English
+    Description: Builds the result page URL directly, so a worker skips the home page and the search box.
+    """
+    params = {'q': query, 'hl': 'en'}
+    if videos:
+        params['tbm'] = 'vid'
+    return "https://www.google.com/search?" + urlencode(params)
+
+
+async def _extract(page, kind):
+    """
+    Input:
+        - page: Playwright async Page
+        - kind: 'sponsored' or 'videos' (str)
+    Output: (list) - Records with href, title, domain and position keys
+    Description: Async counterpart of dom_extract.extract_results, running the same single evaluate_all script.
+    """
+    selector, script = EXTRACTORS[kind]
+    return await page.locator(selector).evaluate_all(script)
+
+
+async def _open_results(page, url, timeout_ms):
+    """
+    Input:
+        - page: Playwright async Page
+        - url: Result page URL (str)
+        - timeout_ms: Timeout in milliseconds (int)
+    Output: None
+    Description: Navigates to a result page and waits for the results container, dismissing the location prompt if it shows up first.
+    """
+    await page.goto(url, wait_until='domcontentloaded', timeout=timeout_ms)
+    prompt = page.locator(LOCATION_PROMPT_SELECTOR)
+    await prompt.or_(page.locator(RESULTS_SELECTOR)).first.wait_for(state='visible', timeout=timeout_ms)
+    if await prompt.first.is_visible():
+        await prompt.first.click()
+        await page.locator(RESULTS_SELECTOR).first.wait_for(state='visible', timeout=timeout_ms)
+
+
+async def check_query(context, query, timeout_ms, relevance_threshold):
+    """
+    Input:
+        - context: Playwright async BrowserContext
+        - query: Search term (str)
+        - timeout_ms: Timeout of each page wait in milliseconds (int)
+        - relevance_threshold: Minimum relevance score of a video title (float)
+    Output: (dict) - Result of the sponsored, video-count and video-relevance checks for the query
+    Description: Runs the suite's checks for one query: at least one sponsored result, at least MIN_YOUTUBE_RESULTS YouTube videos,
+    and the first RELEVANT_VIDEOS_CHECKED video titles related to the query.
+    """
+    page = await context.new_page()
+    try:
+        await _open_results(page, search_url(query), timeout_ms)
+        sponsored = await _extract(page, SPONSORED)
+
+        await _open_results(page, search_url(query, videos=True), timeout_ms)
+        videos = [video for video in await _extract(page, VIDEOS) if 'youtube.com' in (video['href'] or '')]
+    finally:
+        await page.close()
+
+    titles = {}
+    for video in videos:
+        if video['title']:
+            titles.setdefault(video['href'], video['title'])
+    scorer = RelevanceScorer(query, aliases=VIDEO_RELEVANCE_ALIASES, threshold=relevance_threshold)
+    scores = dict(zip(titles, scorer.score_all(titles.values())))
+    first_links = [video['href'] for video in videos][:RELEVANT_VIDEOS_CHECKED]
+    # A first video without a title cannot be shown to be relevant, so it fails the check like in the pytest suite.
+    untitled = [link for link in first_links if link not in scores]
+    irrelevant = [scores[link][0] for link in first_links if link in scores and not scores[link][2]]
+
+    return {
+        'query': query,
+        'sponsored_ok': len(sponsored) > 0,
+        'sponsored': sponsored,
+        'videos_ok': len(videos) >= MIN_YOUTUBE_RESULTS,
+        'videos': videos,
+        'relevance_ok': len(videos) >= RELEVANT_VIDEOS_CHECKED and not irrelevant and not untitled,
+        'irrelevant_titles': irrelevant,
+        'untitled_videos': untitled,
+    }
+
+
+async def _worker(browser, queue, results, timeout_s, relevance_threshold, resource_filter):
+    """
+    Input:
+        - browser: Playwright async Browser
+        - queue: asyncio.Queue of queries
+        - results: List the per-query results are appended to
+        - timeout_s: Time allowed for one query in seconds (float)
+        - relevance_threshold: Minimum relevance score of a video title (float)
+        - resource_filter: ResourceFilter instance, or None to load every resource
+    Output: None
+    Description: One worker owns one browser context and processes queries from the queue until it is empty.
+    """
+    context = await browser.new_context(locale=LOCALE, user_agent=USER_AGENT)
+    if resource_filter is not None:
+        await resource_filter.install_async(context)
+    try:
+        while True:
+            try:
+                query = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(
+                    check_query(context, query, int(timeout_s * 1000), relevance_threshold),
+                    timeout=timeout_s
+                )
+                result['error'] = None
+            except Exception as e:
+                error = f"timed out after {timeout_s:.0f}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+                result = {'query': query, 'sponsored_ok': False, 'videos_ok': False, 'relevance_ok': False, 'error': error}
+            result['duration'] = time.perf_counter() - started
+            results.append(result)
+            status = 'PASSED' if result['error'] is None and result['sponsored_ok'] and result['videos_ok'] and result['relevance_ok'] else 'FAILED'
+            logger.info(f"[{status}] '{query}' in {result['duration']:.1f}s" + (f": {result['error']}" if result['error'] else ""))
+    finally:
+        await context.close()
+
+
+async def run_queries(queries, concurrency=4, timeout_s=60.0, relevance_threshold=0.8, headless=True, filter_resources=True):
+    """
+    Input:
+        - queries: Search terms (list of str)
+        - concurrency: Number of browser contexts working in parallel (int)
+        - timeout_s: Time allowed for one query in seconds (float)
+        - relevance_threshold: Minimum relevance score of a video title (float)
+        - headless: Run Chromium without a window (bool)
+        - filter_resources: Abort images, fonts, media and trackers (bool)
+    Output: (dict) - {'results': per-query results, 'elapsed': seconds, 'queries_per_minute': throughput}
+    Description: Runs the sponsored and video checks for every query on one browser with a bounded pool of concurrent contexts.
+    """
+    queue = asyncio.Queue()
+    for query in queries:
+        queue.put_nowait(query)
+    results = []
+    resource_filter = ResourceFilter() if filter_resources else None
+    started = time.perf_counter()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        try:
+            workers = min(concurrency, len(queries)) or 1
+            await asyncio.gather(*[
+                _worker(browser, queue, results, timeout_s, relevance_threshold, resource_filter)
+                for _ in range(workers)
+            ])
+        finally:
+            await browser.close()
+    elapsed = time.perf_counter() - started
+    queries_per_minute = len(results) / elapsed * 60 if elapsed else 0.0
+    logger.info(f"Checked {len(results)} queries in {elapsed:.1f}s ({queries_per_minute:.1f} queries/minute)")
+    if resource_filter is not None:
+        resource_filter.report()
+    return {'results': results, 'elapsed': elapsed, 'queries_per_minute': queries_per_minute}
+
+
+def save_results(results):
+    """
+    Input: results (list) - Per-query results from run_queries
+    Output: None
+    Description: Records the outcome of each check per query through the result recorder, named like the pytest tests with the query as parameter.
+    The rows are written when the recorder flushes or is closed.
+    """
+    recorder = get_recorder()
+    for result in results:
+        query = result['query']
+        for test_name, key in (
+            ('test_google_search_sponsored', 'sponsored_ok'),
+            ('test_youtube_videos_count', 'videos_ok'),
+            ('test_youtube_videos_relevance', 'relevance_ok'),
+        ):
+            status = 'PASSED' if result[key] else 'FAILED'
+            details = result['error'] or ('Check passed.' if result[key] else 'Check failed.')
+            if key == 'relevance_ok' and result.get('untitled_videos'):
+                details = f"No title was found for the video(s) {', '.join(result['untitled_videos'])}"
+            recorder.record(f"{test_name}[{query}]", status, details)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Run the sponsored and video checks for many search queries in parallel.")
+    parser.add_argument('queries', nargs='*', help="Search terms")
+    parser.add_argument('--queries-file', help="File with one search term per line")
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('SEARCH_CONCURRENCY', '4')), help="Parallel browser contexts")
+    parser.add_argument('--timeout', type=float, default=float(os.getenv('SEARCH_QUERY_TIMEOUT', '60')), help="Seconds allowed per query")
+    parser.add_argument('--threshold', type=float, default=float(os.getenv('RELEVANCE_THRESHOLD', '0.8')), help="Minimum relevance score of a video title")
+    parser.add_argument('--headed', action='store_true', help="Show the browser window")
+    parser.add_argument('--no-resource-filter', action='store_true', help="Load every resource")
+    parser.add_argument('--save', action='store_true', help="Record the results in the database selected by DB_SAVE_MODE")
+    args = parser.parse_args()
+
+    queries = list(args.queries)
+    if args.queries_file:
+        with open(args.queries_file, encoding='utf-8') as f:
+            queries += [line.strip() for line in f if line.strip()]
+    if not queries:
+        parser.error("Give at least one query or --queries-file")
+
+    report = asyncio.run(run_queries(
+        queries,
+        concurrency=args.concurrency,
+        timeout_s=args.timeout,
+        relevance_threshold=args.threshold,
+        headless=not args.headed,
+        filter_resources=not args.no_resource_filter
+    ))
+    if args.save:
+        try:
+            save_results(report['results'])
+        finally:
+            close_recorder()
+            close_pools()
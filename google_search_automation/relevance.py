@@ -0,0 +1,132 @@
+import unicodedata
+import re
+
+# Apostrophes and quote marks are dropped so "Domino's", "Domino’s" and "Dominos" normalize to the same token.
+_DROP_APOSTROPHES = str.maketrans('', '', "'\u2019\u2018`\u00b4\u02bc\u05f3\u05f4\"")
+
+# Combining accents (Latin) and niqqud/cantillation points (Hebrew) left over after NFKD decomposition.
+_COMBINING_MARKS = re.compile(r'[\u0300-\u036f\u0591-\u05bd\u05bf\u05c1\u05c2\u05c4\u05c5\u05c7]')
+
+# Anything that is not a letter or digit in any script separates tokens.
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def normalize_text(text):
+    """
+    Input: text (str) - A title or query
+    Output: (str) - Case-folded text with accents, apostrophes and punctuation removed and single spaces between tokens
+    Description: Unicode-aware normalization. Letters of every script are kept, so Hebrew titles are scored instead of being emptied.
+    """
+    text = unicodedata.normalize('NFKD', text).translate(_DROP_APOSTROPHES)
+    text = _COMBINING_MARKS.sub('', text).casefold()
+    return _SEPARATORS.sub(' ', text).strip()
+
+
+def is_typo(token, spelling):
+    """
+    Input:
+        - token: A normalized title token (str)
+        - spelling: A normalized spelling of a query term (str)
+    Output: (bool) - True if the token is the spelling with one letter added, dropped, replaced or swapped with its neighbour
+    Description: Typo test used for fuzzy matching. An edit at the very end is not a typo but a truncation or another word
+    form ("domino", "dominoes" for "dominos"), so the two words have to differ before their last letter.
+    """
+    if token == spelling or abs(len(token) - len(spelling)) > 1:
+        return False
+    prefix = 0
+    for first, second in zip(token, spelling):
+        if first != second:
+            break
+        prefix += 1
+    if prefix >= min(len(token), len(spelling)) - 1:
+        return False
+    token, spelling = token[prefix:], spelling[prefix:]
+    if len(token) == len(spelling):
+        # One replaced letter, or two neighbouring letters swapped.
+        return token[1:] == spelling[1:] or (token[0] == spelling[1] and token[1] == spelling[0] and token[2:] == spelling[2:])
+    # One added or dropped letter.
+    return token[1:] == spelling or token == spelling[1:]
+
+
+class RelevanceScorer:
+    """
+    Scores titles against a query in batch.
+    The query is normalized once into an index of terms (each with optional alternative spellings).
+    A title's score is the share of query terms it contains, where a term counts when one of the title's
+    tokens equals it, contains it (hashtags and compounds like "#DominosPizza") or is a typo of it (see is_typo).
+    Matches are memoized per token, so tokens repeated across titles are compared only once.
+    """
+
+    def __init__(self, query, aliases=None, threshold=0.8, fuzzy_min_length=5):
+        self.threshold = threshold
+        self.fuzzy_min_length = fuzzy_min_length
+        aliases = aliases or {}
+        # term -> every accepted spelling of it, all normalized
+        self.terms = {}
+        for term in normalize_text(query).split():
+            spellings = {term}
+            for alias in aliases.get(term, ()):
+                spellings.add(normalize_text(alias).replace(' ', ''))
+            self.terms[term] = spellings
+        if not self.terms:
+            raise ValueError("The query has no searchable terms")
+        self._exact = {}
+        for term, spellings in self.terms.items():
+            for spelling in spellings:
+                self._exact.setdefault(spelling, set()).add(term)
+        self._token_cache = {}
+
+    def _terms_for_token(self, token, joined=False):
+        """
+        Input:
+            - token: A normalized title token (str)
+            - joined: Whether the token is two neighbouring title tokens joined together (bool)
+        Output: (frozenset) - Query terms the token matches exactly, contains, or is a typo of
+        Description: Looks the token up in the exact index first and falls back to substring and typo matching, caching the answer.
+        Joined tokens are not searched for substrings, since "Domino Sugar" joined contains "dominos" without being about it.
+        """
+        key = (token, joined)
+        matched = self._token_cache.get(key)
+        if matched is not None:
+            return matched
+        matched = set(self._exact.get(token, ()))
+        for term, spellings in self.terms.items():
+            if term in matched:
+                continue
+            for spelling in spellings:
+                # Short words are one edit away from, or part of, too many other words to be matched loosely.
+                if len(spelling) < self.fuzzy_min_length:
+                    continue
+                if (not joined and spelling in token) or is_typo(token, spelling):
+                    matched.add(term)
+                    break
+        matched = frozenset(matched)
+        self._token_cache[key] = matched
+        return matched
+
+    def score(self, title):
+        """
+        Input: title (str)
+        Output: (float) - Share of query terms found in the title, between 0 and 1
+        Description: Scores a single title.
+        """
+        tokens = normalize_text(title).split()
+        found = set()
+        for token in tokens:
+            found |= self._terms_for_token(token)
+        # Also try each pair of neighbouring tokens joined, for titles like "Domino s" or "Domi nos".
+        for first, second in zip(tokens, tokens[1:]):
+            found |= self._terms_for_token(first + second, joined=True)
+        return len(found) / len(self.terms)
+
+    def score_all(self, titles):
+        """
+        Input: titles (iterable of str)
+        Output: (list) - (title, score, relevant) tuples in input order
+        Description: Scores every title and flags the ones at or above the threshold.
+        """
+        results = []
+        for title in titles:
+            score = self.score(title)
+            results.append((title, score, score >= self.threshold))
+        return results
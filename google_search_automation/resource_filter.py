@@ -0,0 +1,184 @@
+from urllib.parse import urlparse
+from collections import Counter
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Resource types the search tests never look at.
+DEFAULT_BLOCKED_TYPES = ('image', 'media', 'font')
+
+# Third-party hosts that only serve analytics, ads tracking or the embedded YouTube player.
+DEFAULT_DENY_DOMAINS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'googlesyndication.com',
+    'youtube.com',
+    'ytimg.com',
+    'ggpht.com',
+)
+
+
+def _host_matches(host, domains):
+    """
+    Input:
+        - host: Host name of a request (str)
+        - domains: Domain names (iterable of str)
+    Output: (bool) - True if host is one of the domains or a subdomain of one
+    Description: Suffix match on whole domain labels, so 'www.youtube.com' matches 'youtube.com' but 'notyoutube.com' does not.
+    """
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+class ResourceFilter:
+    """
+    Aborts requests the tests do not need before they reach the network.
+    A request is blocked when its resource type is in block_types or its host is in deny_domains,
+    unless its host is in allow_domains, which always wins. Document requests are never blocked.
+    The rules can be changed between tests with configure(); the counters cover the whole context.
+    """
+
+    def __init__(self, block_types=DEFAULT_BLOCKED_TYPES, deny_domains=DEFAULT_DENY_DOMAINS, allow_domains=()):
+        self._lock = threading.Lock()
+        self.configure(block_types, deny_domains, allow_domains)
+        self.blocked_by_type = Counter()
+        self.blocked_requests = 0
+        self.allowed_requests = 0
+        self.loaded_bytes = 0
+
+    def configure(self, block_types=DEFAULT_BLOCKED_TYPES, deny_domains=DEFAULT_DENY_DOMAINS, allow_domains=()):
+        """
+        Input:
+            - block_types: Playwright resource types to abort (iterable of str)
+            - deny_domains: Hosts to abort (iterable of str)
+            - allow_domains: Hosts that are never aborted (iterable of str)
+        Output: None
+        Description: Replaces the filtering rules.
+        """
+        with self._lock:
+            self.block_types = frozenset(block_types)
+            self.deny_domains = tuple(deny_domains)
+            self.allow_domains = tuple(allow_domains)
+
+    def should_block(self, resource_type, url):
+        """
+        Input:
+            - resource_type: Playwright resource type of the request (str)
+            - url: Request URL (str)
+        Output: (bool) - True if the request should be aborted
+        Description: Applies the allow list, then the resource-type and domain deny rules.
+        """
+        if resource_type == 'document':
+            return False
+        host = urlparse(url).hostname or ''
+        if _host_matches(host, self.allow_domains):
+            return False
+        return resource_type in self.block_types or _host_matches(host, self.deny_domains)
+
+    def _count(self, request):
+        """
+        Input: request (Playwright Request)
+        Output: (bool) - True if the request should be aborted
+        Description: Decides on a request and counts it as blocked or allowed.
+        """
+        blocked = self.should_block(request.resource_type, request.url)
+        with self._lock:
+            if blocked:
+                self.blocked_requests += 1
+                self.blocked_by_type[request.resource_type] += 1
+            else:
+                self.allowed_requests += 1
+        return blocked
+
+    def _handle(self, route):
+        """
+        Input: route (Playwright Route)
+        Output: None
+        Description: Route handler that aborts blocked requests and hands the rest to the next handler (replay routes or the network).
+        """
+        if self._count(route.request):
+            route.abort('blockedbyclient')
+        else:
+            route.fallback()
+
+    async def _handle_async(self, route):
+        """
+        Input: route (Playwright async Route)
+        Output: None
+        Description: Async counterpart of _handle for contexts of the async API.
+        """
+        if self._count(route.request):
+            await route.abort('blockedbyclient')
+        else:
+            await route.fallback()
+
+    def _add_loaded(self, sizes):
+        """
+        Input: sizes (dict) - Request.sizes() of a finished request
+        Output: None
+        Description: Adds the bytes a request transferred to the loaded_bytes counter.
+        """
+        with self._lock:
+            self.loaded_bytes += sizes['responseHeadersSize'] + sizes['responseBodySize']
+
+    def _count_loaded(self, request):
+        """
+        Input: request (Playwright Request)
+        Output: None
+        Description: Adds the bytes transferred by a finished request to the loaded_bytes counter.
+        """
+        try:
+            sizes = request.sizes()
+        except Exception:
+            return
+        self._add_loaded(sizes)
+
+    async def _count_loaded_async(self, request):
+        """
+        Input: request (Playwright async Request)
+        Output: None
+        Description: Async counterpart of _count_loaded.
+        """
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        self._add_loaded(sizes)
+
+    def install(self, context):
+        """
+        Input: context (Playwright BrowserContext)
+        Output: None
+        Description: Attaches the filter to every page of the context. Install it after any replay routes, since the most recently added route runs first.
+        """
+        context.route("**/*", self._handle)
+        context.on("requestfinished", self._count_loaded)
+
+    async def install_async(self, context):
+        """
+        Input: context (Playwright async BrowserContext)
+        Output: None
+        Description: install() for contexts of the async API, e.g. the parallel query runner. One filter can serve several contexts.
+        """
+        await context.route("**/*", self._handle_async)
+        context.on("requestfinished", self._count_loaded_async)
+
+    def report(self):
+        """
+        Input: None
+        Output: (dict) - Blocked and allowed request counts, blocked counts per resource type and bytes loaded
+        Description: Logs and returns the filter statistics.
+        """
+        with self._lock:
+            stats = {
+                'blocked_requests': self.blocked_requests,
+                'blocked_by_type': dict(self.blocked_by_type),
+                'allowed_requests': self.allowed_requests,
+                'loaded_bytes': self.loaded_bytes,
+            }
+        logger.info(
+            f"Resource filter blocked {stats['blocked_requests']} request(s) {stats['blocked_by_type']}, "
+            f"allowed {stats['allowed_requests']} request(s) totalling {stats['loaded_bytes']} bytes"
+        )
+        return stats
@@ -0,0 +1,515 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from db_pool import postgres_connection, oracle_connection
+from db_health import get_breaker
+from db_schema import STEP_TIMINGS_POSTGRES_DDL, STEP_TIMINGS_ORACLE_DDL
+from sqlite_store import get_store, close_store, SyncWorker
+import threading
+import logging
+import time
+import atexit
+import glob
+import json
+import uuid
+import os
+
+logger = logging.getLogger(__name__)
+
+POSTGRES = 'PostgreSQL'
+ORACLE = 'Oracle'
+SQLITE = 'SQLite'
+
+# A replay file this old belongs to a replay that never finished (the process crashed) and is picked up again.
+STALE_REPLAY_SECONDS = 600
+
+# Maps DB_SAVE_MODE to the backends a result is written to.
+SAVE_MODE_BACKENDS = {
+    0: (POSTGRES,),
+    1: (ORACLE,),
+    2: (POSTGRES, ORACLE),
+    3: (SQLITE,),
+}
+
+
+def backends_for_mode(db_save_mode):
+    """
+    Input: db_save_mode (int) - The value of DB_SAVE_MODE
+    Output: (tuple) - Names of the backends results are written to
+    Description: Validates the save mode and returns the backends it selects.
+    """
+    if db_save_mode not in SAVE_MODE_BACKENDS:
+        raise ValueError("Unsupported DB_SAVE_MODE value. Use 0 (PostgreSQL), 1 (Oracle), 2 (Both), or 3 (local SQLite).")
+    return SAVE_MODE_BACKENDS[db_save_mode]
+
+
+# Test name under which the recorder stores the duration of its own batch writes.
+RECORDER_TEST_NAME = 'result_recorder'
+
+
+def split_rows(rows):
+    """
+    Input: rows (list) - Tuples of (test_name, status, details, recorded_at, steps)
+    Output: (tuple) - (result rows, step timing rows)
+    Description: Splits buffered rows into test_results rows and test_step_timings rows of (test_name, recorded_at, step, duration_ms).
+    The timing rows share test_name and timestamp with their result row, which is how the two tables are joined.
+    """
+    results = [row[:4] for row in rows]
+    timings = [(row[0], row[3], step, duration_ms) for row in rows for step, duration_ms in row[4]]
+    return results, timings
+
+
+def _is_missing_table(error):
+    """
+    Input: error (Exception) - Error raised by psycopg2 or cx_Oracle
+    Output: (bool) - True if the statement failed because its table does not exist
+    Description: Recognizes PostgreSQL's undefined_table (42P01) and Oracle's ORA-00942.
+    """
+    if getattr(error, 'pgcode', None) == '42P01':
+        return True
+    detail = error.args[0] if error.args else None
+    return getattr(detail, 'code', None) == 942
+
+
+def save_timings(backend, connection, insert, create_table_ddl):
+    """
+    Input:
+        - backend: Name of the backend (str)
+        - connection: Connection the results were just committed on
+        - insert: Callable that inserts the timing rows with a cursor of that connection
+        - create_table_ddl: Statement that creates test_step_timings (str)
+    Output: None
+    Description: Commits the step timings in their own transaction after the results, so a timing problem never costs a result row.
+    If test_step_timings does not exist yet it is created once and the insert is retried; any other failure only logs a warning.
+    """
+    try:
+        insert()
+        connection.commit()
+        return
+    except Exception as e:
+        connection.rollback()
+        if not _is_missing_table(e):
+            logger.warning(f"Failed to save step timings to {backend}: {str(e)}")
+            return
+    logger.info(f"Creating the test_step_timings table in {backend}")
+    try:
+        cursor = connection.cursor()
+        cursor.execute(create_table_ddl)
+        cursor.close()
+        insert()
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        logger.warning(f"Failed to save step timings to {backend}: {str(e)}")
+
+
+def write_postgres_batch(rows):
+    """
+    Input: rows (list) - Tuples of (test_name, status, details, recorded_at, steps)
+    Output: None
+    Description: Inserts all rows into the PostgreSQL test_results table with multi-row INSERTs and one commit, then saves their step timings.
+    The time spent on the results is stored as a step of the result recorder itself.
+    """
+    from psycopg2.extras import execute_values
+    started = time.perf_counter()
+    results, timings = split_rows(rows)
+    with postgres_connection() as connection:
+        cursor = connection.cursor()
+        insert_query = """
+            INSERT INTO test_results (test_name, status, details, timestamp)
+            VALUES %s
+        """
+        execute_values(cursor, insert_query, results, page_size=len(results))
+        connection.commit()
+        timings.append((RECORDER_TEST_NAME, datetime.now(), f'db_write:{POSTGRES}', (time.perf_counter() - started) * 1000))
+        save_timings(POSTGRES, connection, lambda: execute_values(cursor, """
+            INSERT INTO test_step_timings (test_name, timestamp, step, duration_ms)
+            VALUES %s
+        """, timings, page_size=len(timings)), STEP_TIMINGS_POSTGRES_DDL)
+        cursor.close()
+
+
+def write_oracle_batch(rows):
+    """
+    Input: rows (list) - Tuples of (test_name, status, details, recorded_at, steps)
+    Output: None
+    Description: Inserts all rows into the Oracle test_results table using array binding and one commit, then saves their step timings.
+    The time spent on the results is stored as a step of the result recorder itself.
+    """
+    import cx_Oracle
+    started = time.perf_counter()
+    results, timings = split_rows(rows)
+    with oracle_connection() as connection:
+        cursor = connection.cursor()
+        # The placeholders :1 to :4 correspond to test_name, status, details and test_time respectively.
+        insert_query = """
+            INSERT INTO test_results (test_name, status, details, test_time)
+            VALUES (:1, :2, :3, :4)
+        """
+        # datetime values bind as DATE by default, which drops the fractional seconds of the test time.
+        cursor.setinputsizes(None, None, None, cx_Oracle.DB_TYPE_TIMESTAMP)
+        cursor.executemany(insert_query, results)
+        connection.commit()
+        timings.append((RECORDER_TEST_NAME, datetime.now(), f'db_write:{ORACLE}', (time.perf_counter() - started) * 1000))
+
+        def insert_timings():
+            cursor.setinputsizes(None, cx_Oracle.DB_TYPE_TIMESTAMP, None, None)
+            cursor.executemany("""
+                INSERT INTO test_step_timings (test_name, test_time, step, duration_ms)
+                VALUES (:1, :2, :3, :4)
+            """, timings)
+
+        save_timings(ORACLE, connection, insert_timings, STEP_TIMINGS_ORACLE_DDL)
+        cursor.close()
+
+
+def write_sqlite_batch(rows):
+    """
+    Input: rows (list) - Tuples of (test_name, status, details, recorded_at, steps)
+    Output: None
+    Description: Inserts all rows into the local SQLite store in one transaction. They reach PostgreSQL / Oracle through the sync job.
+    """
+    get_store().write_batch(rows)
+
+
+BATCH_WRITERS = {
+    POSTGRES: write_postgres_batch,
+    ORACLE: write_oracle_batch,
+    SQLITE: write_sqlite_batch,
+}
+
+
+class ResultRecorder:
+    """
+    Buffers test results in memory and writes them to the selected backends in bulk.
+    A batch is flushed when it is full, when the flush interval elapses, and when the recorder is closed.
+    Each backend is written on its own worker thread, so a flush takes as long as the slowest backend
+    rather than the sum of all of them. With wait_for_writes=False a flush returns immediately and the
+    writes are joined when the recorder is closed.
+    Rows that cannot be written are appended to a per-backend spool file instead of being dropped.
+    Every backend is guarded by a circuit breaker: while it is open, rows are spooled (or skipped when
+    breaker_action='skip') without trying to connect, and spooled rows are replayed as soon as a write
+    to that backend succeeds again.
+    """
+
+    def __init__(self, backends, batch_size=50, flush_interval=5.0, spool_dir='result_spool', wait_for_writes=True, breaker_action='spool'):
+        self.backends = tuple(backends)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_dir = spool_dir
+        self.wait_for_writes = wait_for_writes
+        self.breaker_action = breaker_action
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock() # Keeps batches in order when the timer and a caller flush together
+        self._spool_lock = threading.Lock()
+        self._replay_locks = {backend: threading.Lock() for backend in self.backends}
+        self._executor = ThreadPoolExecutor(max_workers=len(self.backends), thread_name_prefix="result-writer")
+        self._pending = set()
+        self._stop = threading.Event()
+        self._closed = False
+        self._timer = None
+        if flush_interval and flush_interval > 0:
+            self._timer = threading.Thread(target=self._flush_periodically, name="result-recorder", daemon=True)
+            self._timer.start()
+
+    def record(self, test_name, status, details, recorded_at=None, steps=()):
+        """
+        Input:
+            - test_name: Name of the test (str)
+            - status: Status of the test (e.g., 'PASSED', 'FAILED') (str)
+            - details: Additional details about the test (str)
+            - recorded_at: When the test ran (datetime), defaults to now
+            - steps: (step, duration_ms) pairs timed during the test (iterable)
+        Output: None
+        Description: Queues a result row. The timestamp is taken on the client so a batched row keeps the time the test actually ran.
+        """
+        if self._closed:
+            raise RuntimeError("ResultRecorder is closed")
+        row = (test_name, status, details, recorded_at or datetime.now(), tuple(steps))
+        with self._buffer_lock:
+            self._buffer.append(row)
+            batch_full = len(self._buffer) >= self.batch_size
+        if batch_full:
+            self.flush()
+
+    def flush(self, wait_for_writes=None):
+        """
+        Input: wait_for_writes (bool) - Whether to block until the backends are written, defaults to the recorder setting
+        Output: None
+        Description: Writes every buffered row to each backend concurrently, one worker per backend.
+        When the worker pool no longer takes work (at interpreter exit) the rows are written on the calling thread instead.
+        """
+        if wait_for_writes is None:
+            wait_for_writes = self.wait_for_writes
+        with self._flush_lock:
+            with self._buffer_lock:
+                rows, self._buffer = self._buffer, []
+            futures = []
+            for backend in self.backends if rows else ():
+                try:
+                    future = self._executor.submit(self._write, backend, rows)
+                except RuntimeError:
+                    # The interpreter shuts worker pools down before atexit handlers run, so the final flush writes inline.
+                    self._write(backend, rows)
+                    continue
+                futures.append(future)
+                self._pending.add(future)
+                future.add_done_callback(self._pending.discard)
+        if wait_for_writes:
+            wait(futures)
+
+    def join(self):
+        """
+        Input: None
+        Output: None
+        Description: Blocks until every write submitted so far has finished.
+        """
+        wait(list(self._pending))
+
+    def _write(self, backend, rows):
+        """
+        Input:
+            - backend: Name of the backend (str)
+            - rows: Buffered result rows (list)
+        Output: None
+        Description: Writes one batch to one backend, spooling the rows to disk if the write fails or the backend's circuit breaker is open.
+        """
+        breaker = get_breaker(backend)
+        if not breaker.allow_request():
+            if self.breaker_action == 'skip':
+                logger.warning(f"{backend} circuit is open, skipping {len(rows)} result(s)")
+            else:
+                logger.warning(f"{backend} circuit is open, not connecting")
+                self._spool(backend, rows)
+            return
+        logger.info(f"Saving {len(rows)} result(s) to {backend}")
+        try:
+            BATCH_WRITERS[backend](rows)
+        except Exception as e:
+            breaker.record_failure()
+            logger.error(f"Failed to save {len(rows)} result(s) to {backend}: {str(e)}")
+            self._spool(backend, rows)
+            return
+        breaker.record_success()
+        logger.info(f"Results saved to {backend} successfully")
+        try:
+            self.replay_spool(backend)
+        except Exception as e:
+            # The batch itself is saved; spooled rows stay on disk for the next replay.
+            logger.error(f"Failed to replay spooled results into {backend}: {str(e)}")
+
+    def _spool_path(self, backend):
+        """
+        Input: backend (str) - Name of the backend
+        Output: (str) - Path of the backend's spool file
+        Description: Returns where rows for a backend are spooled.
+        """
+        return os.path.join(self.spool_dir, f"{backend.lower()}.jsonl")
+
+    def _claim_spool(self, backend):
+        """
+        Input: backend (str) - Name of the backend
+        Output: (list) - Paths of the replay files now owned by this call
+        Description: Moves the backend's spool file aside under a unique name, so concurrent writers start a fresh one, and
+        claims replay files left behind by replays that crashed. Every file is claimed with an atomic rename, so when
+        several processes share the spool directory only one of them gets each file.
+        """
+        spool_path = self._spool_path(backend)
+        candidates = [spool_path] if os.path.exists(spool_path) else []
+        for path in glob.glob(glob.escape(spool_path) + '.*.replay'):
+            # Replay files are named <spool>.<pid>.<claimed at>.<random>.replay; older versions used <spool>.<pid>.replay.
+            try:
+                claimed_at = int(path[len(spool_path) + 1:].split('.')[1])
+            except (IndexError, ValueError):
+                try:
+                    claimed_at = os.path.getmtime(path)
+                except OSError:
+                    continue
+            if time.time() - claimed_at >= STALE_REPLAY_SECONDS:
+                candidates.append(path)
+        claimed = []
+        for path in candidates:
+            replay_path = f"{spool_path}.{os.getpid()}.{int(time.time())}.{uuid.uuid4().hex}.replay"
+            try:
+                os.replace(path, replay_path)
+            except OSError:
+                continue # Claimed by another process first
+            claimed.append(replay_path)
+        return claimed
+
+    def _read_spool(self, backend, path):
+        """
+        Input:
+            - backend: Name of the backend (str)
+            - path: Spool or replay file (str)
+        Output: (list) - Result rows read from the file
+        Description: Parses a spool file. Lines that cannot be parsed are moved to <spool>.bad instead of failing the replay.
+        """
+        rows = []
+        bad_lines = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    steps = tuple((step, duration_ms) for step, duration_ms in row.get('steps', ()))
+                    rows.append((row['test_name'], row['status'], row['details'], datetime.fromisoformat(row['recorded_at']), steps))
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    bad_lines.append(line if line.endswith('\n') else line + '\n')
+        if bad_lines:
+            bad_path = f"{self._spool_path(backend)}.bad"
+            with self._spool_lock, open(bad_path, 'a', encoding='utf-8') as f:
+                f.writelines(bad_lines)
+            logger.error(f"Moved {len(bad_lines)} unreadable spooled line(s) for {backend} to {bad_path}")
+        return rows
+
+    def replay_spool(self, backend):
+        """
+        Input: backend (str) - Name of the backend
+        Output: (int) - Number of spooled rows written to the backend
+        Description: Writes rows spooled for a backend back into its database in batches. Replays of one backend run one at
+        a time, the spool file and any abandoned replay files are claimed first, and rows that still fail are spooled again.
+        A crash in the middle of a replay can send the rows already written a second time when its file is picked up again.
+        """
+        with self._replay_locks.setdefault(backend, threading.Lock()):
+            with self._spool_lock:
+                replay_paths = self._claim_spool(backend)
+            if not replay_paths:
+                return 0
+            rows = []
+            for replay_path in replay_paths:
+                rows += self._read_spool(backend, replay_path)
+            logger.info(f"Replaying {len(rows)} spooled result(s) into {backend}")
+            written = 0
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                try:
+                    BATCH_WRITERS[backend](batch)
+                except Exception as e:
+                    get_breaker(backend).record_failure()
+                    logger.error(f"Failed to replay spooled results into {backend}: {str(e)}")
+                    self._spool(backend, rows[start:])
+                    break
+                written += len(batch)
+            for replay_path in replay_paths:
+                os.remove(replay_path)
+        if written:
+            logger.info(f"Replayed {written} spooled result(s) into {backend} successfully")
+        return written
+
+    def _spool(self, backend, rows):
+        """
+        Input:
+            - backend: Name of the backend (str)
+            - rows: Result rows that could not be written (list)
+        Output: None
+        Description: Appends rows to the backend's spool file as JSON lines so they can be inspected or replayed later.
+        """
+        os.makedirs(self.spool_dir, exist_ok=True)
+        spool_path = self._spool_path(backend)
+        with self._spool_lock, open(spool_path, 'a', encoding='utf-8') as f:
+            for test_name, status, details, recorded_at, steps in rows:
+                f.write(json.dumps({
+                    'test_name': test_name,
+                    'status': status,
+                    'details': details,
+                    'recorded_at': recorded_at.isoformat(),
+                    'steps': steps,
+                }) + '\n')
+        logger.warning(f"Spooled {len(rows)} result(s) for {backend} to {spool_path}")
+
+    def _flush_periodically(self):
+        """
+        Input: None
+        Output: None
+        Description: Background loop that flushes the buffer every flush_interval seconds until the recorder is closed.
+        """
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Periodic flush of test results failed: {str(e)}")
+
+    def close(self):
+        """
+        Input: None
+        Output: None
+        Description: Stops the flush timer, writes whatever is still buffered and waits for every background write. Safe to call more than once.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.join()
+        self.flush(wait_for_writes=True)
+        self.join()
+        self._executor.shutdown(wait=True)
+
+
+_recorder = None
+_sync_worker = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """
+    Input: None
+    Output: ResultRecorder instance
+    Description: Returns the process-wide recorder, creating it from DB_SAVE_MODE, RESULT_BATCH_SIZE, RESULT_FLUSH_INTERVAL,
+    RESULT_SPOOL_DIR, RESULT_WRITE_MODE ('wait' blocks a flush until every backend is written, 'background' returns immediately)
+    and DB_BREAKER_ACTION ('spool' or 'skip' rows while a backend's circuit is open) on first call.
+    With DB_SAVE_MODE=3 and SQLITE_SYNC_MODE set (0, 1 or 2, like DB_SAVE_MODE), the local results are also pushed to those
+    backends every SQLITE_SYNC_INTERVAL seconds and when the recorder is closed.
+    """
+    global _recorder, _sync_worker
+    with _recorder_lock:
+        if _recorder is None:
+            db_save_mode = int(os.getenv('DB_SAVE_MODE', '0'))  # 0 = PostgreSQL, 1 = Oracle, 2 = Both
+            write_mode = os.getenv('RESULT_WRITE_MODE', 'wait')
+            if write_mode not in ('wait', 'background'):
+                raise ValueError("Unsupported RESULT_WRITE_MODE value. Use 'wait' or 'background'.")
+            breaker_action = os.getenv('DB_BREAKER_ACTION', 'spool')
+            if breaker_action not in ('spool', 'skip'):
+                raise ValueError("Unsupported DB_BREAKER_ACTION value. Use 'spool' or 'skip'.")
+            _recorder = ResultRecorder(
+                backends_for_mode(db_save_mode),
+                batch_size=int(os.getenv('RESULT_BATCH_SIZE', '50')),
+                flush_interval=float(os.getenv('RESULT_FLUSH_INTERVAL', '5')),
+                spool_dir=os.getenv('RESULT_SPOOL_DIR', 'result_spool'),
+                wait_for_writes=(write_mode == 'wait'),
+                breaker_action=breaker_action
+            )
+            sync_mode = os.getenv('SQLITE_SYNC_MODE')
+            if SQLITE in _recorder.backends and sync_mode:
+                sync_backends = backends_for_mode(int(sync_mode))
+                if SQLITE in sync_backends:
+                    raise ValueError("Unsupported SQLITE_SYNC_MODE value. Use 0 (PostgreSQL), 1 (Oracle), or 2 (Both).")
+                _sync_worker = SyncWorker(
+                    get_store(),
+                    {backend: BATCH_WRITERS[backend] for backend in sync_backends},
+                    interval=float(os.getenv('SQLITE_SYNC_INTERVAL', '30'))
+                )
+        return _recorder
+
+
+def close_recorder():
+    """
+    Input: None
+    Output: None
+    Description: Flushes and closes the process-wide recorder if one was created, then runs the last sync of the local store.
+    """
+    global _recorder, _sync_worker
+    with _recorder_lock:
+        recorder, _recorder = _recorder, None
+        sync_worker, _sync_worker = _sync_worker, None
+    if recorder is not None:
+        recorder.close()
+    if sync_worker is not None:
+        sync_worker.stop()
+    close_store()
+
+
+# Buffered rows are flushed even if the session ends without reaching the conftest teardown.
+atexit.register(close_recorder)
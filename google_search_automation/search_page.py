@@ -0,0 +1,23 @@
+# Query searched by the pytest suite
+SEARCH_QUERY = "Domino's"
+
+# Selectors for the Google search result pages, shared by the pytest suite and the parallel search runner
+SEARCH_INPUT_SELECTOR = 'textarea[name="q"], input[title="Search"], input[aria-label="Search"], input[type="text"], input[class="gLFyf gsfi"]'
+RESULTS_SELECTOR = '#search'
+CONSENT_BUTTON_SELECTOR = 'button:has-text("Accept all")'
+LOCATION_PROMPT_SELECTOR = 'text="Not now"'
+SPONSORED_SELECTOR = 'div[data-text-ad="1"]'
+VIDEOS_TAB_SELECTOR = 'text="Videos"'
+VIDEOS_TAB_SELECTED_SELECTOR = '[aria-current="page"]:has-text("Videos")'
+YOUTUBE_LINK_SELECTOR = 'a[href*="youtube.com/watch"]'
+
+# Browser identity used for every search context
+LOCALE = "en-US"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Other spellings of query terms that count as relevant in video titles (normalized term -> spellings)
+VIDEO_RELEVANCE_ALIASES = {'dominos': ["דומינו'ס"]}
+
+# Minimum number of YouTube results the video checks expect, and how many of the first ones must be relevant
+MIN_YOUTUBE_RESULTS = 2
+RELEVANT_VIDEOS_CHECKED = 2
@@ -0,0 +1,289 @@
+from contextlib import closing, contextmanager
+from datetime import datetime
+from db_health import get_breaker
+import threading
+import sqlite3
+import argparse
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.sqlite3')
+
+
+class SQLiteStore:
+    """
+    Local test result store used by DB_SAVE_MODE=3: the test_results and test_step_timings tables in a WAL-mode SQLite file,
+    so recording a result needs no server and no network round trip. Rows get an increasing id, and sync_state keeps,
+    per remote backend, the id of the last row pushed there, so a sync picks up exactly the rows it has not sent yet.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS test_results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    test_name TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    details TEXT,
+                    test_time TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS test_results_name_time_idx ON test_results (test_name, test_time);
+                CREATE TABLE IF NOT EXISTS test_step_timings (
+                    result_id INTEGER NOT NULL REFERENCES test_results (id),
+                    test_name TEXT NOT NULL,
+                    test_time TEXT NOT NULL,
+                    step TEXT NOT NULL,
+                    duration_ms REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS test_step_timings_result_idx ON test_step_timings (result_id);
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    backend TEXT PRIMARY KEY,
+                    last_id INTEGER NOT NULL
+                );
+            """)
+
+    def write_batch(self, rows):
+        """
+        Input: rows (list) - Tuples of (test_name, status, details, recorded_at, steps)
+        Output: None
+        Description: Inserts a batch of results with their step timings in one transaction.
+        """
+        with self._lock, self._connection:
+            for test_name, status, details, recorded_at, steps in rows:
+                result_id = self._connection.execute(
+                    "INSERT INTO test_results (test_name, status, details, test_time) VALUES (?, ?, ?, ?)",
+                    (test_name, status, details, recorded_at.isoformat())
+                ).lastrowid
+                self._connection.executemany(
+                    "INSERT INTO test_step_timings (result_id, test_name, test_time, step, duration_ms) VALUES (?, ?, ?, ?, ?)",
+                    [(result_id, test_name, recorded_at.isoformat(), step, duration_ms) for step, duration_ms in steps]
+                )
+
+    def pending(self, backend, limit):
+        """
+        Input:
+            - backend: Name of the remote backend (str)
+            - limit: Maximum number of results to return (int)
+        Output: (tuple) - (rows, last_id): up to limit (test_name, status, details, recorded_at, steps) tuples not yet
+        pushed to the backend, oldest first, and the id of the last one (None when there are none)
+        Description: Reads the next batch to sync, in the row format the result recorder's batch writers take.
+        """
+        with self._lock:
+            with closing(self._connection.execute("""
+                SELECT id, test_name, status, details, test_time
+                FROM test_results
+                WHERE id > COALESCE((SELECT last_id FROM sync_state WHERE backend = ?), 0)
+                ORDER BY id
+                LIMIT ?
+            """, (backend, limit))) as cursor:
+                results = cursor.fetchall()
+            if not results:
+                return [], None
+            steps = {}
+            with closing(self._connection.execute(
+                "SELECT result_id, step, duration_ms FROM test_step_timings WHERE result_id BETWEEN ? AND ? ORDER BY rowid",
+                (results[0][0], results[-1][0])
+            )) as cursor:
+                for result_id, step, duration_ms in cursor:
+                    steps.setdefault(result_id, []).append((step, duration_ms))
+        rows = [
+            (test_name, status, details, datetime.fromisoformat(test_time), tuple(steps.get(result_id, ())))
+            for result_id, test_name, status, details, test_time in results
+        ]
+        return rows, results[-1][0]
+
+    def mark_synced(self, backend, last_id):
+        """
+        Input:
+            - backend: Name of the remote backend (str)
+            - last_id: Id of the last result written to it (int)
+        Output: None
+        Description: Moves the backend's sync position forward.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO sync_state (backend, last_id) VALUES (?, ?) "
+                "ON CONFLICT (backend) DO UPDATE SET last_id = MAX(last_id, excluded.last_id)",
+                (backend, last_id)
+            )
+
+    @contextmanager
+    def sync_lock(self, timeout=0.0):
+        """
+        Input: timeout (float) - Seconds to wait for another process to finish its sync
+        Output: (bool) - True while this process holds the lock (context manager), False if it could not be taken in time
+        Description: Cross-process lock around a sync, so two processes sharing the file never push the same batch.
+        It is a write transaction on a separate lock file next to the store, which works on every platform and does not
+        hold up result writes to the store itself while a remote write is in progress.
+        """
+        connection = sqlite3.connect(self.path + '.sync-lock', timeout=timeout, isolation_level=None)
+        try:
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                connection.execute("ROLLBACK")
+        finally:
+            connection.close()
+
+    def close(self):
+        """
+        Input: None
+        Output: None
+        Description: Closes the SQLite connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Input: None
+    Output: SQLiteStore instance
+    Description: Returns the process-wide local store at SQLITE_PATH, opening it on first call.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteStore(os.getenv('SQLITE_PATH', DEFAULT_PATH))
+        return _store
+
+
+def close_store():
+    """
+    Input: None
+    Output: None
+    Description: Closes the process-wide local store if one was opened.
+    """
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        store.close()
+
+
+def sync_store(store, writers, batch_size=500, lock_timeout=0.0):
+    """
+    Input:
+        - store: SQLiteStore to read from
+        - writers: Remote backend name to its batch writer (dict), e.g. a subset of result_recorder.BATCH_WRITERS
+        - batch_size: Number of results per bulk write (int)
+        - lock_timeout: Seconds to wait while another process syncs the same store (float)
+    Output: (dict) - Backend name to the number of results pushed to it
+    Description: Pushes every result a backend has not received yet, in bulk batches. The position only moves after a batch
+    is committed remotely, so a failed batch is retried by the next sync (a crash right after a commit can send it twice).
+    Every process of a run (pytest-xdist workers, concurrent runs) may sync the same file, so the whole
+    read/write/mark sequence runs under the store's sync lock; when another process holds it, this sync is skipped.
+    Backends whose circuit breaker is open are skipped. The breaker is only asked once there is a batch to send, so a
+    half-open probe always ends in a recorded success or failure.
+    """
+    synced = {backend: 0 for backend in writers}
+    with store.sync_lock(lock_timeout) as locked:
+        if not locked:
+            logger.info(f"Another process is syncing {store.path}, skipping this sync")
+            return synced
+        for backend, writer in writers.items():
+            breaker = get_breaker(backend)
+            while True:
+                rows, last_id = store.pending(backend, batch_size)
+                if not rows:
+                    break
+                if not breaker.allow_request():
+                    logger.warning(f"{backend} circuit is open, not syncing")
+                    break
+                try:
+                    writer(rows)
+                except Exception as e:
+                    breaker.record_failure()
+                    logger.error(f"Failed to sync {len(rows)} result(s) to {backend}: {str(e)}")
+                    break
+                breaker.record_success()
+                store.mark_synced(backend, last_id)
+                synced[backend] += len(rows)
+            if synced[backend]:
+                logger.info(f"Synced {synced[backend]} result(s) from {store.path} to {backend}")
+    return synced
+
+
+class SyncWorker:
+    """
+    Background thread that runs sync_store every interval seconds, and once more when it is stopped.
+    A periodic sync is skipped while another process syncs the same store; the final one waits up to final_lock_timeout
+    seconds for it, so the rows of a finishing process are not left behind.
+    """
+
+    def __init__(self, store, writers, interval=30.0, batch_size=500, final_lock_timeout=60.0):
+        self.store = store
+        self.writers = writers
+        self.interval = interval
+        self.batch_size = batch_size
+        self.final_lock_timeout = final_lock_timeout
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sqlite-sync", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """
+        Input: None
+        Output: None
+        Description: Sync loop; errors are logged and retried on the next round.
+        """
+        while not self._stop.wait(self.interval):
+            self.sync()
+
+    def sync(self, lock_timeout=0.0):
+        """
+        Input: lock_timeout (float) - Seconds to wait while another process syncs the same store
+        Output: None
+        Description: Runs one sync, logging instead of raising on errors.
+        """
+        try:
+            sync_store(self.store, self.writers, self.batch_size, lock_timeout)
+        except Exception as e:
+            logger.error(f"Syncing local test results failed: {str(e)}")
+
+    def stop(self):
+        """
+        Input: None
+        Output: None
+        Description: Stops the loop and pushes whatever is still pending.
+        """
+        self._stop.set()
+        self._thread.join()
+        self.sync(self.final_lock_timeout)
+
+
+if __name__ == "__main__":
+    from result_recorder import BATCH_WRITERS, backends_for_mode
+    from db_pool import close_pools
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Push test results recorded locally with DB_SAVE_MODE=3 to PostgreSQL and/or Oracle.")
+    parser.add_argument('--path', default=os.getenv('SQLITE_PATH', DEFAULT_PATH), help="SQLite file to read")
+    parser.add_argument('--mode', type=int, choices=[0, 1, 2], default=int(os.getenv('SQLITE_SYNC_MODE', '0')),
+                        help="Backends to push to: 0 (PostgreSQL), 1 (Oracle), or 2 (Both)")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--lock-timeout', type=float, default=60.0, help="Seconds to wait while another process syncs the same file")
+    args = parser.parse_args()
+
+    store = SQLiteStore(args.path)
+    try:
+        sync_store(store, {backend: BATCH_WRITERS[backend] for backend in backends_for_mode(args.mode)}, args.batch_size, args.lock_timeout)
+    finally:
+        store.close()
+        close_pools()
@@ -0,0 +1,40 @@
+from content_scan import TermMatcher, scan_stream
+
+
+def _chunks(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def test_matcher_finds_term_split_across_feeds():
+    matcher = TermMatcher(['Domino', 'pizza'])
+    assert matcher.feed('order a Dom') == set()
+    assert matcher.feed('ino pi') == {0}
+    assert matcher.feed('zza') == {1}
+
+
+def test_matcher_overlapping_terms_and_case_folding():
+    matcher = TermMatcher(['he', 'she', 'hers'], case_sensitive=False)
+    assert matcher.feed('uSHErs') == {0, 1, 2}
+
+
+def test_scan_stream_multibyte_character_split_across_chunks():
+    data = "<title>פיצה דומינו'ס — Domino’s</title>".encode('utf-8')
+    chunks = _chunks(data, 3)
+    # With 3-byte chunks the two-byte Hebrew letters and the three-byte dash and apostrophe are cut mid-character.
+    assert any(chunk.decode('utf-8', errors='replace') != chunk.decode('utf-8', errors='ignore') for chunk in chunks)
+    result = scan_stream(chunks, ["דומינו'ס", 'Domino’s'], require_all=True)
+    assert result['found'] == ["דומינו'ס", 'Domino’s']
+    assert result['truncated'] is False
+
+
+def test_scan_stream_stops_at_first_match():
+    data = ('x' * 100 + 'needle' + 'y' * 100).encode('utf-8')
+    result = scan_stream(_chunks(data, 10), ['needle', 'missing'])
+    assert result['found'] == ['needle']
+    assert result['bytes_read'] == 110
+
+
+def test_scan_stream_byte_cap():
+    data = ('x' * 100 + 'needle').encode('utf-8')
+    result = scan_stream(_chunks(data, 7), ['needle'], max_bytes=50)
+    assert result == {'found': [], 'bytes_read': 50, 'truncated': True}
@@ -1,31 +1,42 @@
-import cx_Oracle
-import psycopg2
 from playwright.sync_api import sync_playwright
 import pytest
-import requests
 import logging
-import re
 import os
-
-
-# Set environment variables
-os.environ['ORACLE_HOST'] = 'DESKTOP-CKAGB2K'
-os.environ['ORACLE_PORT'] = '1521'
-os.environ['ORACLE_DBNAME'] = 'xe'
-os.environ['ORACLE_USER'] = 'system'
-os.environ['ORACLE_PASSWORD'] = 'Roni2108'
-
-os.environ['POSTGRES_HOST'] = 'localhost'
-os.environ['POSTGRES_PORT'] = '5432'
-os.environ['POSTGRES_DBNAME'] = 'postgres'
-os.environ['POSTGRES_USER'] = 'postgres'
-os.environ['POSTGRES_PASSWORD'] = 'Roni2108'
-
-
-# Global variables to keep track of dependencies
-sponsored_url = None  # This will store the URL of the sponsored result found during the search.
-search_performed = False  # This flag indicates whether a search has been performed or not.
-youtube_video_links = []  # Store YouTube video links
+from result_recorder import get_recorder
+from timing import span, drain
+from network_replay import install_network_mode
+from browser_pool import launch_or_connect, ContextPool
+from content_scan import scan_response
+from link_health import check_links
+from relevance import normalize_text, RelevanceScorer
+from dom_extract import extract_results, SPONSORED, VIDEOS
+from search_page import (
+    SEARCH_QUERY, SEARCH_INPUT_SELECTOR, CONSENT_BUTTON_SELECTOR, RESULTS_SELECTOR, LOCATION_PROMPT_SELECTOR, SPONSORED_SELECTOR,
+    VIDEOS_TAB_SELECTOR, VIDEOS_TAB_SELECTED_SELECTOR, YOUTUBE_LINK_SELECTOR, LOCALE, USER_AGENT, VIDEO_RELEVANCE_ALIASES,
+    MIN_YOUTUBE_RESULTS, RELEVANT_VIDEOS_CHECKED
+)
+from wait_strategy import wait_for, race, timed, wait_timeout, click_and_wait_for_navigation
+
+
+# Set default connection settings; values already present in the environment take precedence
+os.environ.setdefault('ORACLE_HOST', 'DESKTOP-CKAGB2K')
+os.environ.setdefault('ORACLE_PORT', '1521')
+os.environ.setdefault('ORACLE_DBNAME', 'xe')
+os.environ.setdefault('ORACLE_USER', 'system')
+os.environ.setdefault('ORACLE_PASSWORD', 'Roni2108')
+
+os.environ.setdefault('POSTGRES_HOST', 'localhost')
+os.environ.setdefault('POSTGRES_PORT', '5432')
+os.environ.setdefault('POSTGRES_DBNAME', 'postgres')
+os.environ.setdefault('POSTGRES_USER', 'postgres')
+os.environ.setdefault('POSTGRES_PASSWORD', 'Roni2108')
+
+
+# Any of these in the landing page makes test_check_dominos_in_response pass
+LANDING_PAGE_TERMS = ["Domino's", "Dominos"]
+
+# Relevance scoring of video titles against the search term; the Hebrew spelling covers en-IL result pages
+VIDEO_RELEVANCE_QUERY = "Domino's"
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -35,92 +46,125 @@ def normalize_title(title):
     """
     Input: title (str) - The title to normalize.
     Output: (str) - The normalized title.
-    Description: This function removes all non-letter characters from the title and converts it to lowercase.
+    Description: This function removes apostrophes, accents and punctuation from the title and case-folds it. Letters of every script are kept, so Hebrew titles survive.
     """
-    return re.sub(r'[^a-zA-Z\s]', '', title).lower()
+    return normalize_text(title)
 
 @pytest.fixture(scope="session")
-def browser():
+def browser(pytestconfig):
     """
-    Input: None
+    Input: pytestconfig (pytest Config)
     Output: Browser instance
-    Description: Sets up a Playwright browser instance to be used for testing. It launches the browser in headless(True/False) mode and ensures it is closed after the session.
+    Description: Sets up a Playwright browser instance to be used for testing. It connects to the browser server given with --browser-ws when there is one,
+    otherwise it launches the browser in headless mode (or headed with --headed) and ensures it is closed after the session.
     """
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
+        with span("fixture:browser"):
+            browser = launch_or_connect(p, pytestconfig.getoption("--browser-ws"), headless=not pytestconfig.getoption("--headed"))
         yield browser
-        browser.close()
+        browser.close() # For a browser server this only disconnects, the server keeps running for the next session
 
 @pytest.fixture(scope="session")
-def page_with_results(browser):
+def context_pool(browser, network_mode, har_path, resource_filter, pytestconfig):
     """
-    Input: browser (Browser instance)
-    Output: Page instance with search results
-    Description: This fixture sets up a Playwright page, navigates to Google, performs a search for 'Domino's', and handles any location prompts.
+    Input:
+        - browser (Browser instance)
+        - network_mode: 'live', 'record' or 'replay' (str)
+        - har_path: HAR file used by record and replay modes (str)
+        - resource_filter: ResourceFilter instance, or None to load every resource
+        - pytestconfig (pytest Config)
+    Output: ContextPool instance
+    Description: Pre-warms --context-pool-size browser contexts from the saved storage state, each wired for the network mode and resource filter.
     """
-    context = browser.new_context(locale="en-US", user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    page = context.new_page()
-
-    logger.info("Navigating to Google and setting the language to English")
-    page.goto("https://www.google.com?hl=en")
-    page.wait_for_load_state('networkidle')  
-
-    logger.info("Using specific selectors to find the search input field")
-    search_input = page.query_selector('textarea[name="q"], input[title="Search"], input[aria-label="Search"], input[type="text"], input[class="gLFyf gsfi"]')
+    def setup(context):
+        install_network_mode(context, network_mode, har_path)
+        if resource_filter is not None:
+            resource_filter.install(context) # Installed last so it runs before the replay routes
+
+    with span("fixture:context_pool"):
+        pool = ContextPool(
+            browser,
+            size=pytestconfig.getoption("--context-pool-size"),
+            context_options={'locale': LOCALE, 'user_agent': USER_AGENT},
+            setup=setup,
+            storage_state=pytestconfig.getoption("--storage-state")
+        )
+    yield pool
+    pool.close()
 
-    assert search_input is not None, "Search input not found!"
-    logger.info("Search input field found")
-
-    logger.info("Performing a search for 'Domino's'")
-    search_input.fill("Domino's")
-    search_input.press('Enter')
+@pytest.fixture(scope="session")
+def page_with_results(context_pool, resource_filter):
+    """
+    Input:
+        - context_pool (ContextPool with pre-warmed browser contexts)
+        - resource_filter: ResourceFilter instance, or None to load every resource
+    Output: Page instance with search results
+    Description: This fixture takes a pre-warmed Playwright page, navigates to Google, performs a search for 'Domino's', and handles any consent and location prompts.
+    In replay mode every response is served from the recorded HAR or the HTML snapshots, so no network is needed.
+    Requests rejected by the resource filter are aborted before they reach the network.
+    The cookies left by the prompts are saved, so the next contexts and the next runs skip them.
+    """
+    context, page = context_pool.acquire()
+    with span("fixture:page_with_results"):
+        logger.info("Navigating to Google and setting the language to English")
+        with timed("google home"):
+            page.goto("https://www.google.com?hl=en", wait_until='domcontentloaded')
+
+        # The consent screen only shows up without saved consent cookies.
+        if race(page, {'search_input': SEARCH_INPUT_SELECTOR, 'consent': CONSENT_BUTTON_SELECTOR}, "search page", wait_timeout('SEARCH_INPUT_TIMEOUT', 30000)) == 'consent':
+            page.click(CONSENT_BUTTON_SELECTOR)
+            logger.info("Consent screen accepted.")
+
+        logger.info("Using specific selectors to find the search input field")
+        search_input = wait_for(page, SEARCH_INPUT_SELECTOR, "search input", wait_timeout('SEARCH_INPUT_TIMEOUT', 30000))
+
+        assert search_input is not None, "Search input not found!"
+        logger.info("Search input field found")
+
+        logger.info(f"Performing a search for '{SEARCH_QUERY}'")
+        search_input.fill(SEARCH_QUERY)
+        search_input.press('Enter')
+
+        # Whichever comes first: the location prompt or the results container.
+        logger.info("Waiting for search results or the location prompt")
+        first = race(
+            page,
+            {'location_prompt': LOCATION_PROMPT_SELECTOR, 'results': RESULTS_SELECTOR},
+            "search results",
+            wait_timeout('RESULTS_TIMEOUT', 30000)
+        )
+
+        # If location prompt appears, it will click "Not now".
+        if first == 'location_prompt' or page.locator(LOCATION_PROMPT_SELECTOR).first.is_visible():
+            page.click(LOCATION_PROMPT_SELECTOR)
+            logger.info("Location prompt dismissed.")
+            if first == 'location_prompt':
+                wait_for(page, RESULTS_SELECTOR, "search results after prompt", wait_timeout('RESULTS_TIMEOUT', 30000))
+        else:
+            logger.info("Location prompt did not appear.")
 
-    logger.info("Waiting for search results to load")
-    page.wait_for_load_state('networkidle')
-
-    # If location prompt appears, it will click "Not now". 
-    logger.info("Handling location prompt if it appears")
-    try:
-        page.click('text="Not now"', timeout=5000)
-        logger.info("Location prompt dismissed.")
-    except Exception as e:
-        logger.info("Location prompt did not appear.")
+    if resource_filter is not None:
+        resource_filter.report()
+    context_pool.save_storage_state(context)
 
     yield page
-    context.close()
+    context_pool.release(context, page)
 
-def get_postgres_connection():
-    """
-    Input: None
-    Output: psycopg2 connection object
-    Description: Establishes and returns a connection to the PostgreSQL database using environment variables for the configuration.
-    """
-    return psycopg2.connect( # establishes a connection to the PostgreSQL database.
-        dbname=os.getenv('POSTGRES_DBNAME', 'postgres'), # Get the database name from environment variables
-        user=os.getenv('POSTGRES_USER', 'postgres'), # Get the user name from environment variables
-        password=os.getenv('POSTGRES_PASSWORD', 'Roni2108'), # Get the password from environment variables
-        host=os.getenv('POSTGRES_HOST', 'localhost'), # Get the database host from environment variables
-        port=int(os.getenv('POSTGRES_PORT', '5432')) # Get the database port from environment variables
-    )
-
-def get_oracle_connection():
+def open_videos_tab(page):
     """
-    Input: None
-    Output: cx_Oracle connection object
-    Description: Establishes and returns a connection to the Oracle database using environment variables for the configuration.
+    Input: page (Playwright Page)
+    Output: None
+    Description: Switches the search results to the 'Videos' tab unless it is already selected, then waits for the first YouTube result instead of for network idle.
     """
-    dsn = cx_Oracle.makedsn( # establishes a connection to the Oracle database.
-        os.getenv('ORACLE_HOST', 'localhost'), # Get the Oracle host from environment variables
-        int(os.getenv('ORACLE_PORT', '1521')), # Get the Oracle port from environment variables
-        service_name=os.getenv('ORACLE_DBNAME', 'xe') # Get the Oracle service name from environment variables
-    )
-    return cx_Oracle.connect(
-        user=os.getenv('ORACLE_USER', 'system'), # Get the Oracle user name from environment variables
-        password=os.getenv('ORACLE_PASSWORD', 'Roni2108'), # Get the Oracle password from environment variables
-        dsn=dsn # Use the constructed DSN for the connection
-    )
-
-
+    if page.locator(VIDEOS_TAB_SELECTED_SELECTOR).count():
+        logger.info("The 'Videos' tab is already open")
+        return
+    click_and_wait_for_navigation(page, VIDEOS_TAB_SELECTOR, "videos tab", wait_timeout('RESULTS_TIMEOUT', 30000))
+    try:
+        wait_for(page, YOUTUBE_LINK_SELECTOR, "youtube results", wait_timeout('VIDEO_RESULTS_TIMEOUT', 5000), state='attached')
+    except Exception:
+        # The tests report how many videos were found, so a missing result is not an error here.
+        logger.info("No YouTube results on the 'Videos' tab")
 
 def save_test_result(test_name, status, details):
     """
@@ -129,95 +173,58 @@ def save_test_result(test_name, status, details):
         - status: Status of the test (e.g., 'PASSED', 'FAILED') (str)
         - details: Additional details about the test (str)
     Output: None
-    Description: Saves the test result to either PostgreSQL, Oracle, or both, based on the environment variable `DB_SAVE_MODE`.
+    Description: Queues the test result for PostgreSQL, Oracle, both, or the local SQLite store, based on the environment variable `DB_SAVE_MODE`. Rows are written in batches by the result recorder and always flushed at the end of the session.
+    The durations of the steps timed since the previous result (fixture setup, waits, HTTP calls) are stored with it.
     """
-    # Get the database save mode from environment variables
-    db_save_mode = int(os.getenv('DB_SAVE_MODE', '0'))  # 0 = PostgreSQL, 1 = Oracle, 2 = Both
+    logger.info(f"Recording result of {test_name}")
+    get_recorder().record(test_name, status, details, steps=drain())
 
-    # Validate the DB_SAVE_MODE value
-    if db_save_mode not in [0, 1, 2]:
-        raise ValueError("Unsupported DB_SAVE_MODE value. Use 0 (PostgreSQL), 1 (Oracle), or 2 (Both).")
 
-    # Save to PostgreSQL if DB_SAVE_MODE is 0 or 2
-    if db_save_mode == 0 or db_save_mode == 2:
-        logger.info("Saving result to PostgreSQL")
-        try:
-            connection = get_postgres_connection() # Establish a PostgreSQL connection
-            cursor = connection.cursor()
-            # Insert query to save test result to PostgreSQL
-            insert_query = """
-                INSERT INTO test_results (test_name, status, details, timestamp)
-                VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
-            """
-            cursor.execute(insert_query, (test_name, status, details))
-            connection.commit() # Commit the transaction
-            cursor.close()
-            connection.close()
-            logger.info("Result saved to PostgreSQL successfully")
-        except Exception as e:
-            logger.error(f"Failed to save result to PostgreSQL: {str(e)}")
-
-    # Save to Oracle if DB_SAVE_MODE is 1 or 2
-    if db_save_mode == 1 or db_save_mode == 2:
-        logger.info("Saving result to Oracle")
-        try:
-            connection = get_oracle_connection() # Establish an Oracle connection
-            cursor = connection.cursor()
-            # Insert query to save test result to Oracle
-            # The placeholders :1, :2, and :3 correspond to test_name, status, and details respectively.
-            insert_query = """
-                INSERT INTO test_results (test_name, status, details, test_time)
-                VALUES (:1, :2, :3, SYSTIMESTAMP)
-            """
-            cursor.execute(insert_query, (test_name, status, details))
-            connection.commit() # Commit the transaction
-            cursor.close()
-            connection.close()
-            logger.info("Result saved to Oracle successfully")
-        except Exception as e:
-            logger.error(f"Failed to save result to Oracle: {str(e)}")
-
-
-def test_google_search_sponsored(page_with_results):
+def test_google_search_sponsored(page_with_results, artifacts):
     """
     Input:
         - page_with_results: Playwright page object with the search results loaded
+        - artifacts: Store for the values handed to the dependent tests
     Output: None
     Description: Performs a search on Google, identifies the first sponsored result, clicks on it, and saves the URL.
     """
-    global sponsored_url, search_performed
     test_name = 'test_google_search_sponsored'
     try:
         logger.info("Running test_google_search_sponsored")
         page = page_with_results
-        search_performed = True
 
         logger.info("Asserting that there is at least one sponsored result")
         try:
-            # Wait for the first sponsored result to appear, with a timeout of 60 seconds
-            page.wait_for_selector('div[data-text-ad="1"]', timeout=60000) 
+            # Sponsored results are rendered together with the organic ones, so once the results are there without an ad, there is none to wait for.
+            race(
+                page,
+                {'sponsored': SPONSORED_SELECTOR, 'results': RESULTS_SELECTOR},
+                "sponsored result",
+                wait_timeout('SPONSORED_TIMEOUT', 60000)
+            )
         except Exception as e:
             raise AssertionError("No sponsored results found within the timeout period!") from e
 
-        sponsored_results = page.query_selector_all('div[data-text-ad="1"]')
+        sponsored_results = extract_results(page, SPONSORED)
         assert len(sponsored_results) > 0, "No sponsored results found!"
         logger.info(f"Found {len(sponsored_results)} sponsored results")
+        artifacts.put(SEARCH_QUERY, 'sponsored_links', [result['href'] for result in sponsored_results if result['href']])
 
         logger.info("Clicking on the first sponsored result and copying the URL")
-        sponsored_results[0].click() # Click on the first sponsored result
-        page.wait_for_load_state('load') # Wait for the new page to load
+        page.locator(SPONSORED_SELECTOR).first.click() # Click on the first sponsored result
+        with timed("sponsored page load"):
+            page.wait_for_load_state('load') # Wait for the new page to load
         sponsored_url = page.url # Save the URL of the sponsored result
 
         logger.info(f"Sponsored URL: {sponsored_url}")
 
-        # Save the URL to a file for later use
-        with open("sponsored_url.txt", "w") as f:
-            f.write(sponsored_url)
-
         # Checkes that at least one url was found
         assert sponsored_url is not None, "No sponsored URL found!"
         logger.info("Sponsored URL found successfully")
 
+        # Save the URL for the tests that call it
+        artifacts.put(SEARCH_QUERY, 'sponsored_url', sponsored_url)
+
         save_test_result(test_name, 'PASSED', 'Sponsored URL found and saved successfully.')
     except Exception as e:
         # Log the error and save the test result as failed
@@ -225,29 +232,23 @@ def test_google_search_sponsored(page_with_results):
         save_test_result(test_name, 'FAILED', str(e))
         raise
 
-def test_api_call_to_sponsored_url():
+@pytest.mark.requires_artifacts('sponsored_url')
+def test_api_call_to_sponsored_url(http_client, required_artifacts):
     """
-    Input: None
+    Input:
+        - http_client (fixture providing the shared, caching HTTP client)
+        - required_artifacts (fixture providing the sponsored URL stored by test_google_search_sponsored; the test is skipped without it)
     Output: None
     Description: Performs an API call to the saved sponsored URL and verifies the response status code is 200.
     """
-    global sponsored_url
     test_name = 'test_api_call_to_sponsored_url'
-
-    # Check if sponsored_url is available
-    if not sponsored_url:
-        logger.info(f"Skipping {test_name} because no sponsored URL was found in the previous test.")
-        pytest.skip(f"Skipping {test_name} because no sponsored URL was found in the previous test.")
+    sponsored_url = required_artifacts['sponsored_url']
     try:
-        # Read the saved sponsored URL from the file
-        with open("sponsored_url.txt", "r") as f:
-            sponsored_url = f.read().strip()
-
         logger.info("Running test_api_call_to_sponsored_url")
         logger.info(f"Performing an API call to the URL: {sponsored_url}")
 
-        # Perform an API call to the saved URL
-        response = requests.get(sponsored_url)
+        # Perform an API call to the saved URL; only the headers are needed, so the body is left to the keyword check
+        response = http_client.get(sponsored_url, stream=True)
         logger.info(f"Received response with status code: {response.status_code}")
 
         # Check if the response status code is 200
@@ -261,33 +262,28 @@ def test_api_call_to_sponsored_url():
         save_test_result(test_name, 'FAILED', str(e))
         raise
 
-def test_check_dominos_in_response():
+@pytest.mark.requires_artifacts('sponsored_url')
+def test_check_dominos_in_response(http_client, required_artifacts):
     """
-    Input: None
+    Input:
+        - http_client (fixture providing the shared, caching HTTP client)
+        - required_artifacts (fixture providing the sponsored URL stored by test_google_search_sponsored; the test is skipped without it)
     Output: None
     Description: Performs an API call to the saved sponsored URL and checks if 'Domino's' or 'Dominos' is present in the response content.
     """
-    global sponsored_url
     test_name = 'test_check_dominos_in_response'
-
-    # Check if sponsored_url is available
-    if not sponsored_url:
-        logger.info(f"Skipping {test_name} because no sponsored URL was found in the previous test.")
-        pytest.skip(f"Skipping {test_name} because no sponsored URL was found in the previous test.")
+    sponsored_url = required_artifacts['sponsored_url']
     try:
-        # Read the saved sponsored URL from the file
-        with open("sponsored_url.txt", "r") as f:
-            sponsored_url = f.read().strip()
-
         logger.info("Running test_check_dominos_in_response")
         logger.info(f"Performing an API call to the URL: {sponsored_url}")
 
-        # Perform an API call to the saved URL
-        response = requests.get(sponsored_url)
+        # Perform an API call to the saved URL; reuses the response of the status check when it is still unread
+        response = http_client.get(sponsored_url, stream=True)
         logger.info("Checking if 'Domino's' or 'Dominos' is present in the response content")
 
-        # Check if the response content contains 'Domino's' or 'Dominos'
-        assert "Domino's" in response.text or "Dominos" in response.text, "Response does not contain 'Domino's' or 'Dominos'"
+        # Stream the body and stop downloading as soon as one of the terms is found
+        scan = scan_response(response, LANDING_PAGE_TERMS, max_bytes=int(os.getenv('LANDING_PAGE_MAX_BYTES', str(5 * 1024 * 1024))))
+        assert scan['found'], "Response does not contain 'Domino's' or 'Dominos'" + (f" in the first {scan['bytes_read']} bytes" if scan['truncated'] else "")
         logger.info("'Domino's' or 'Dominos' is present in the response content")
 
         save_test_result(test_name, 'PASSED', "'Domino's' or 'Dominos' is present in the response content.")
@@ -297,36 +293,37 @@ def test_check_dominos_in_response():
         save_test_result(test_name, 'FAILED', str(e))
         raise
 
-def test_youtube_videos_count(page_with_results):
+def test_youtube_videos_count(page_with_results, artifacts):
     """
-    Input: page_with_results (fixture providing a Playwright page object with search results)
+    Input:
+        - page_with_results (fixture providing a Playwright page object with search results)
+        - artifacts (fixture storing the video links and titles for test_youtube_videos_relevance)
     Output: None
     Description: Navigates to the 'Videos' tab in Google search results and verifies that there are at least two YouTube video links on the first page.
     """
-    global search_performed, youtube_video_links
     test_name = 'test_youtube_videos_count'
     try:
         page = page_with_results
         logger.info("Running test_youtube_videos_count")
 
-        # Check if a search has already been performed
-        if not search_performed:
-            search_performed = True
-        else:
-            logger.info("Using the previously performed search for 'Domino's'")
-
         logger.info("Navigating to the 'Videos' tab")
-        page.click('text="Videos"')
-        page.wait_for_load_state('networkidle')
+        open_videos_tab(page)
 
         logger.info("Asserting that there are at least two results from youtube.com on the first page")
-        youtube_results = page.query_selector_all('a[href*="youtube.com/watch"]')
-
-        # Collect the video links
-        youtube_video_links = [result.get_attribute('href') for result in youtube_results if 'youtube.com' in result.get_attribute('href')]
+        youtube_results = extract_results(page, VIDEOS)
+
+        # Collect the video links, and the title of the first result for each link, so the relevance test
+        # checks the same videos even when it runs on another pytest-xdist worker with a page of its own
+        youtube_video_links = [result['href'] for result in youtube_results if 'youtube.com' in (result['href'] or '')]
+        youtube_video_titles = {}
+        for result in youtube_results:
+            if result['href'] in youtube_video_links and result['title']:
+                youtube_video_titles.setdefault(result['href'], result['title'])
+        artifacts.put(SEARCH_QUERY, 'youtube_video_titles', youtube_video_titles)
+        artifacts.put(SEARCH_QUERY, 'youtube_video_links', youtube_video_links)
 
         # Assert that there are at least two YouTube video links
-        assert len(youtube_video_links) >= 2, f"Expected at least 2 YouTube results, but found {len(youtube_video_links)}"
+        assert len(youtube_video_links) >= MIN_YOUTUBE_RESULTS, f"Expected at least {MIN_YOUTUBE_RESULTS} YouTube results, but found {len(youtube_video_links)}"
         logger.info(f"Found {len(youtube_video_links)} YouTube results on the first page of the 'Videos' tab")
 
         save_test_result(test_name, 'PASSED', f"Found {len(youtube_video_links)} YouTube results.")
@@ -337,41 +334,40 @@ def test_youtube_videos_count(page_with_results):
         raise
 
 
-def test_youtube_videos_relevance(page_with_results):
+@pytest.mark.requires_artifacts('youtube_video_links', 'youtube_video_titles')
+def test_youtube_videos_relevance(required_artifacts):
     """
-    Input: page_with_results (fixture providing a Playwright page object with search results)
+    Input:
+        - required_artifacts (fixture providing the video links and titles stored by test_youtube_videos_count; the test is skipped without them)
     Output: None
     Description: Verifies that the titles of the two YouTube videos found in the previous test are related to the search term 'Domino's' or 'Dominos'.
     """
-    global search_performed, youtube_video_links
     test_name = 'test_youtube_videos_relevance'
+    youtube_video_links = required_artifacts['youtube_video_links']
+    titles = required_artifacts['youtube_video_titles']
     try:
-        if len(youtube_video_links) < 2:
+        if len(youtube_video_links) < RELEVANT_VIDEOS_CHECKED:
             logger.info(f"Skipping {test_name} because less than two YouTube video links were found in the previous test.")
             pytest.skip(f"Skipping {test_name} because less than two YouTube video links were found in the previous test.")
 
-        page = page_with_results
-        if not search_performed:
-            search_performed = True
-        else:
-            logger.info("Using the previously performed search for 'Domino's'")
-
         logger.info("Running test_youtube_videos_relevance")
-
-        logger.info("Navigating to the 'Videos' tab")
-        page.click('text="Videos"')
-        page.wait_for_load_state('networkidle')
-
         logger.info("Asserting that the videos are related to the search term 'Domino's' or 'Dominos'")
 
-        for video_link in youtube_video_links[:2]:  # Only check the first two videos
-            video_element = page.query_selector(f'a[href="{video_link}"]')
-            title_element = video_element.query_selector('h3, span[aria-label], div[aria-label]')  # Adjust as necessary to target the title
-            if title_element:
-                title = title_element.inner_text().strip()
-                normalized_title = normalize_title(title)
-                logger.info(f"Video title: {title}")
-                assert "dominos" in normalized_title, f"Video title does not contain 'Domino's' or 'Dominos': {title}"
+        # Score every stored video title in one batch
+        scorer = RelevanceScorer(
+            VIDEO_RELEVANCE_QUERY,
+            aliases=VIDEO_RELEVANCE_ALIASES,
+            threshold=float(os.getenv('RELEVANCE_THRESHOLD', '0.8'))
+        )
+        scores = dict(zip(titles, scorer.score_all(titles.values())))
+        relevant_count = sum(1 for _, _, relevant in scores.values() if relevant)
+        logger.info(f"{relevant_count} of {len(scores)} video titles are related to the search term")
+
+        for video_link in youtube_video_links[:RELEVANT_VIDEOS_CHECKED]:  # The first two videos must be relevant
+            assert video_link in scores, f"No title was found for the video {video_link}"
+            title, score, relevant = scores[video_link]
+            logger.info(f"Video title: {title} (score {score:.2f})")
+            assert relevant, f"Video title does not contain 'Domino's' or 'Dominos': {title}"
 
         logger.info("First two video titles contain 'Dominos'")
         save_test_result(test_name, 'PASSED', "First two video titles contain 'Dominos'.")
@@ -380,3 +376,35 @@ def test_youtube_videos_relevance(page_with_results):
         logger.error(f"Test {test_name} failed: {str(e)}")
         save_test_result(test_name, 'FAILED', str(e))
         raise
+
+
+@pytest.mark.requires_artifacts('sponsored_links', 'youtube_video_links', any_of=True)
+def test_link_health(required_artifacts, artifacts):
+    """
+    Input:
+        - required_artifacts (fixture providing the sponsored and video links stored by the earlier tests; the test is skipped without any)
+        - artifacts (fixture storing the 'link_health' results)
+    Output: None
+    Description: Checks every extracted sponsored and YouTube link concurrently and verifies that each one answers without an error status.
+    The status, latency and final URL of every link are stored as the 'link_health' artifact.
+    """
+    test_name = 'test_link_health'
+    links = required_artifacts.get('sponsored_links', []) + required_artifacts.get('youtube_video_links', [])
+    if not links:
+        pytest.skip(f"Skipping {test_name} because no sponsored or video links were stored by a previous test.")
+    try:
+        logger.info(f"Running test_link_health on {len(links)} links")
+        with span("link_check"):
+            results = check_links(links)
+        artifacts.put(SEARCH_QUERY, 'link_health', results)
+
+        broken = [f"{result['url']} ({result['error'] or result['status']})" for result in results if not result['ok']]
+        assert not broken, f"{len(broken)} of {len(results)} links are broken: {', '.join(broken)}"
+        logger.info(f"All {len(results)} links answered successfully")
+
+        save_test_result(test_name, 'PASSED', f"All {len(results)} sponsored and video links answered successfully.")
+    except Exception as e:
+        # Log the error and save the test result as failed
+        logger.error(f"Test {test_name} failed: {str(e)}")
+        save_test_result(test_name, 'FAILED', str(e))
+        raise
@@ -0,0 +1,68 @@
+from relevance import normalize_text, is_typo, RelevanceScorer
+import pytest
+
+QUERY = "Domino's"
+ALIASES = {'dominos': ["דומינו'ס"]}
+
+
+def test_normalize_text_unifies_spellings():
+    for title in ("Domino's", "Domino’s", "Dominos", "Dominó's", "Ｄｏｍｉｎｏ'ｓ", "DOMINO'S"):
+        assert normalize_text(title) == 'dominos'
+    assert normalize_text("דומינו'ס פיצה") == 'דומינוס פיצה'
+
+
+@pytest.mark.parametrize('title', [
+    "Domino's Pizza new menu",
+    "Domino’s pizza review",
+    "Dominó's en México",
+    "Ｄｏｍｉｎｏ'ｓ Japan",
+    "Dominos delivery hack",
+    "Domino s pizza",
+    "דומינו'ס פיצה",
+    "Dominso pizza taste test",
+    "Dmoinos pizza",
+    "Dominis pizza",
+    "#DominosPizza taste test",
+    "DominosIndia new launch",
+    "#דומינו'סישראל",
+])
+def test_relevant_titles(title):
+    assert RelevanceScorer(QUERY, aliases=ALIASES).score(title) == 1.0
+
+
+@pytest.mark.parametrize('title', [
+    "Domino effect",
+    "Dominoes falling",
+    "Domino",
+    "Dominator trailer",
+    "Pizza Hut review",
+    "Domino Sugar cookies",
+])
+def test_unrelated_titles(title):
+    assert RelevanceScorer(QUERY, aliases=ALIASES).score(title) == 0.0
+
+
+@pytest.mark.parametrize('token, spelling, expected', [
+    ('dominso', 'dominos', True),   # swapped neighbours
+    ('dmoinos', 'dominos', True),
+    ('dominis', 'dominos', True),   # replaced letter
+    ('dominnos', 'dominos', True),  # added letter
+    ('dominos', 'dominos', False),  # equal is an exact match, not a typo
+    ('domino', 'dominos', False),   # truncation
+    ('dominoes', 'dominos', False), # another word form
+    ('dominox', 'dominos', False),  # only the last letter differs
+    ('dmnos', 'dominos', False),    # two edits
+])
+def test_is_typo(token, spelling, expected):
+    assert is_typo(token, spelling) is expected
+
+
+def test_short_terms_only_match_exactly():
+    scorer = RelevanceScorer("pizza hut")
+    assert scorer.score("Pizza Hat") == 0.5
+    assert scorer.score("Pizxa Hut") == 1.0
+
+
+def test_score_all_flags_threshold():
+    results = RelevanceScorer(QUERY, threshold=0.8).score_all(["Domino's menu", "Domino effect"])
+    assert [relevant for _, _, relevant in results] == [True, False]
@@ -0,0 +1,138 @@
+from datetime import datetime
+from result_recorder import ResultRecorder, STALE_REPLAY_SECONDS
+from db_health import get_breaker, OPEN
+import result_recorder
+import subprocess
+import threading
+import sqlite3
+import time
+import sys
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_atexit_flush_keeps_buffered_rows(tmp_path):
+    """
+    A session that ends without the conftest teardown still writes its buffered rows: the atexit handler runs after the
+    interpreter has shut the worker pools down, so the final flush must not depend on them.
+    """
+    sqlite_path = tmp_path / 'results.sqlite3'
+    env = dict(os.environ, DB_SAVE_MODE='3', SQLITE_PATH=str(sqlite_path), RESULT_FLUSH_INTERVAL='0',
+               RESULT_SPOOL_DIR=str(tmp_path / 'spool'))
+    env.pop('SQLITE_SYNC_MODE', None)
+    script = "from result_recorder import get_recorder; get_recorder().record('test_atexit', 'PASSED', 'buffered')"
+    completed = subprocess.run([sys.executable, '-c', script], cwd=HERE, env=env, capture_output=True, text=True, timeout=60)
+
+    assert completed.returncode == 0, completed.stderr
+    assert 'cannot schedule new futures' not in completed.stderr
+    with sqlite3.connect(sqlite_path) as connection:
+        rows = connection.execute("SELECT test_name, status, details FROM test_results").fetchall()
+    assert rows == [('test_atexit', 'PASSED', 'buffered')]
+
+
+def _recorder(tmp_path, backend, writer, monkeypatch, **options):
+    """
+    Builds a recorder for a fake backend whose batch writer is the given callable.
+    """
+    monkeypatch.setitem(result_recorder.BATCH_WRITERS, backend, writer)
+    return ResultRecorder([backend], flush_interval=0, spool_dir=str(tmp_path / 'spool'), **options)
+
+
+def _row(name):
+    return (name, 'PASSED', 'details', datetime(2024, 1, 1, 12, 0, 0, 123456), (('step', 1.5),))
+
+
+def test_failed_write_is_spooled_and_replayed(tmp_path, monkeypatch):
+    written = []
+    failing = [True]
+
+    def writer(rows):
+        if failing[0]:
+            raise ConnectionError("backend down")
+        written.extend(rows)
+
+    recorder = _recorder(tmp_path, 'test_spool_backend', writer, monkeypatch)
+    try:
+        recorder._write('test_spool_backend', [_row('first')])
+        assert written == []
+        assert os.path.exists(recorder._spool_path('test_spool_backend'))
+
+        failing[0] = False
+        recorder._write('test_spool_backend', [_row('second')])
+        assert [row[0] for row in written] == ['second', 'first']
+        assert written[1] == _row('first')
+        assert not os.listdir(tmp_path / 'spool')
+    finally:
+        recorder.close()
+
+
+def test_open_breaker_spools_or_skips_without_writing(tmp_path, monkeypatch):
+    calls = []
+    for action, backend in (('spool', 'test_open_spool_backend'), ('skip', 'test_open_skip_backend')):
+        breaker = get_breaker(backend)
+        while breaker.state != OPEN:
+            breaker.record_failure()
+        recorder = _recorder(tmp_path / action, backend, calls.append, monkeypatch, breaker_action=action)
+        try:
+            recorder._write(backend, [_row('blocked')])
+            assert os.path.exists(recorder._spool_path(backend)) == (action == 'spool')
+        finally:
+            recorder.close()
+    assert calls == []
+
+
+def test_replay_quarantines_unreadable_lines(tmp_path, monkeypatch):
+    written = []
+    recorder = _recorder(tmp_path, 'test_corrupt_backend', written.extend, monkeypatch)
+    try:
+        recorder._spool('test_corrupt_backend', [_row('good')])
+        with open(recorder._spool_path('test_corrupt_backend'), 'a', encoding='utf-8') as f:
+            f.write('{"test_name": "truncated\n')
+        recorder._write('test_corrupt_backend', [_row('live')])
+        assert [row[0] for row in written] == ['live', 'good']
+        with open(recorder._spool_path('test_corrupt_backend') + '.bad', encoding='utf-8') as f:
+            assert f.read() == '{"test_name": "truncated\n'
+    finally:
+        recorder.close()
+
+
+def test_replay_picks_up_abandoned_replay_files_only(tmp_path, monkeypatch):
+    written = []
+    recorder = _recorder(tmp_path, 'test_leftover_backend', written.extend, monkeypatch)
+    try:
+        spool_path = recorder._spool_path('test_leftover_backend')
+        recorder._spool('test_leftover_backend', [_row('abandoned')])
+        os.replace(spool_path, f"{spool_path}.1.{int(time.time()) - STALE_REPLAY_SECONDS}.dead.replay")
+        recorder._spool('test_leftover_backend', [_row('in_progress')])
+        in_progress = f"{spool_path}.2.{int(time.time())}.live.replay"
+        os.replace(spool_path, in_progress)
+
+        assert recorder.replay_spool('test_leftover_backend') == 1
+        assert [row[0] for row in written] == ['abandoned']
+        assert os.listdir(tmp_path / 'spool') == [os.path.basename(in_progress)]
+    finally:
+        recorder.close()
+
+
+def test_concurrent_replays_write_every_row_once(tmp_path, monkeypatch):
+    written = []
+    lock = threading.Lock()
+
+    def slow_writer(rows):
+        time.sleep(0.05)
+        with lock:
+            written.extend(rows)
+
+    recorder = _recorder(tmp_path, 'test_concurrent_backend', slow_writer, monkeypatch)
+    try:
+        recorder._spool('test_concurrent_backend', [_row(f'row_{index}') for index in range(10)])
+        threads = [threading.Thread(target=recorder.replay_spool, args=('test_concurrent_backend',)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(row[0] for row in written) == sorted(f'row_{index}' for index in range(10))
+        assert not os.listdir(tmp_path / 'spool')
+    finally:
+        recorder.close()
@@ -0,0 +1,49 @@
+from datetime import datetime
+from sqlite_store import SQLiteStore, sync_store
+from db_health import get_breaker, OPEN, CLOSED
+
+
+def test_sync_without_pending_rows_keeps_the_probe(tmp_path):
+    """
+    A sync that finds nothing to send must not use up the half-open probe of an open breaker, otherwise the backend
+    stays half-open and every later sync is refused.
+    """
+    store = SQLiteStore(str(tmp_path / 'results.sqlite3'))
+    breaker = get_breaker('test_sync_backend')
+    while breaker.state != OPEN:
+        breaker.record_failure()
+    breaker._opened_at -= breaker._current_timeout # Let the backoff elapse
+    written = []
+    try:
+        assert sync_store(store, {'test_sync_backend': written.extend}) == {'test_sync_backend': 0}
+        assert breaker.state == OPEN
+
+        store.write_batch([('test_sync', 'PASSED', 'synced', datetime(2024, 1, 1), (('step', 1.5),))])
+        assert sync_store(store, {'test_sync_backend': written.extend}) == {'test_sync_backend': 1}
+        assert breaker.state == CLOSED
+        assert [row[:3] for row in written] == [('test_sync', 'PASSED', 'synced')]
+    finally:
+        store.close()
+
+
+def test_sync_is_skipped_while_another_process_syncs(tmp_path):
+    """
+    Two processes sharing the store must not push the same batch: while one holds the sync lock, the other does not
+    read or write anything.
+    """
+    path = str(tmp_path / 'results.sqlite3')
+    store, other = SQLiteStore(path), SQLiteStore(path)
+    written = []
+    try:
+        store.write_batch([('test_sync', 'PASSED', 'once', datetime(2024, 1, 1), ())])
+        with other.sync_lock() as locked:
+            assert locked
+            assert sync_store(store, {'test_lock_backend': written.extend}) == {'test_lock_backend': 0}
+        assert written == []
+
+        assert sync_store(store, {'test_lock_backend': written.extend}) == {'test_lock_backend': 1}
+        assert sync_store(other, {'test_lock_backend': written.extend}) == {'test_lock_backend': 0}
+        assert len(written) == 1
+    finally:
+        store.close()
+        other.close()
@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Steps are collected per thread, so the result writer threads never mix their timings into a test's.
+_local = threading.local()
+
+
+def _steps():
+    """
+    Input: None
+    Output: (list) - The (step, duration_ms) pairs collected on the current thread
+    Description: Returns the current thread's collection, creating it on first use.
+    """
+    steps = getattr(_local, 'steps', None)
+    if steps is None:
+        steps = _local.steps = []
+    return steps
+
+
+@contextmanager
+def span(step):
+    """
+    Input: step (str) - Name of the step, e.g. 'wait:search results' or 'http_get'
+    Output: None (context manager)
+    Description: Times the wrapped block, logs the duration and collects it for the next test result recorded on this thread. Failed steps are timed too.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        _steps().append((step, duration_ms))
+        logger.info(f"Step '{step}' took {duration_ms:.0f} ms")
+
+
+def drain():
+    """
+    Input: None
+    Output: (list) - The (step, duration_ms) pairs collected on this thread since the last drain
+    Description: Hands over and resets the current thread's collection. Steps of session fixtures end up with the first result recorded after them.
+    """
+    steps = _steps()
+    _local.steps = []
+    return steps
@@ -0,0 +1,83 @@
+from timing import span
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def wait_timeout(name, default_ms):
+    """
+    Input:
+        - name: Environment variable holding the timeout (str)
+        - default_ms: Timeout used when the variable is not set (int)
+    Output: (int) - Timeout in milliseconds
+    Description: Reads a configurable wait timeout.
+    """
+    return int(os.getenv(name, str(default_ms)))
+
+
+def timed(label):
+    """
+    Input: label (str) - Name of the step being timed
+    Output: Context manager
+    Description: Times the wrapped wait as a 'wait:<label>' step, which is logged and stored with the next test result.
+    """
+    return span(f"wait:{label}")
+
+
+def wait_for(page, selector, label, timeout, state='visible'):
+    """
+    Input:
+        - page: Playwright Page
+        - selector: Selector to wait for (str)
+        - label: Name used in the timing log (str)
+        - timeout: Timeout in milliseconds (int)
+        - state: Element state to wait for (str)
+    Output: ElementHandle of the first match
+    Description: Waits for one specific element and logs how long it took.
+    """
+    with timed(label):
+        return page.wait_for_selector(selector, state=state, timeout=timeout)
+
+
+def race(page, conditions, label, timeout):
+    """
+    Input:
+        - page: Playwright Page
+        - conditions: Mapping of condition name to selector, in priority order (dict)
+        - label: Name used in the timing log (str)
+        - timeout: Timeout in milliseconds (int)
+    Output: (str) - Name of the first condition whose element is visible
+    Description: Waits for whichever of several elements shows up first instead of waiting for them one after the other.
+    If more than one is visible when the wait ends, the one listed first wins.
+    """
+    locators = {name: page.locator(selector) for name, selector in conditions.items()}
+    any_of = None
+    for locator in locators.values():
+        any_of = locator if any_of is None else any_of.or_(locator)
+    with timed(label):
+        any_of.first.wait_for(state='visible', timeout=timeout)
+    for name, locator in locators.items():
+        if locator.first.is_visible():
+            logger.info(f"Wait '{label}' resolved by '{name}'")
+            return name
+    # The winning element disappeared between the wait and the check; report the first condition that is still attached.
+    for name, locator in locators.items():
+        if locator.count():
+            return name
+    raise AssertionError(f"Wait '{label}' resolved but none of {list(conditions)} is present any more")
+
+
+def click_and_wait_for_navigation(page, selector, label, timeout):
+    """
+    Input:
+        - page: Playwright Page
+        - selector: Selector of the element to click (str)
+        - label: Name used in the timing log (str)
+        - timeout: Timeout in milliseconds (int)
+    Output: None
+    Description: Clicks an element and waits until the navigation it starts has parsed its DOM, without waiting for the network to go idle.
+    """
+    with timed(label):
+        with page.expect_navigation(wait_until='domcontentloaded', timeout=timeout):
+            page.click(selector, timeout=timeout)